@@ -2,10 +2,13 @@
 AI Chat endpoints for OpenAI integration
 """
 
-from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
-from typing import Optional, Dict, Any
-from app.services.openai_service import get_ai_response
+from fastapi import APIRouter, HTTPException, Depends
+from pydantic import BaseModel, Field
+from typing import Optional, Dict, Any, List
+from app.api.responses import sse_response
+from app.core.security import get_current_user, require_admin
+from app.services.openai_service import get_ai_response, stream_ai_response, submit_ai_batch, get_ai_batch_results
+from app.websocket.manager import websocket_manager
 
 router = APIRouter()
 
@@ -17,6 +20,9 @@ class ChatResponse(BaseModel):
     response: str
     status: str = "success"
 
+class BatchChatRequest(BaseModel):
+    messages: List[str] = Field(..., min_length=1, max_length=50000)
+
 @router.post("/chat", response_model=ChatResponse)
 async def chat_with_ai(request: ChatRequest):
     """
@@ -28,6 +34,50 @@ async def chat_with_ai(request: ChatRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"AI service error: {str(e)}")
 
+@router.post("/chat/stream")
+async def stream_chat_with_ai(request: ChatRequest):
+    """
+    Stream the AI assistant's response as server-sent events
+    """
+    return sse_response(stream_ai_response(request.message, request.route_data))
+
+@router.post("/chat/socket", response_model=ChatResponse)
+async def socket_chat_with_ai(
+    request: ChatRequest,
+    current_user: Dict[str, Any] = Depends(get_current_user)
+):
+    """
+    Stream the AI assistant's response to the user's WebSocket sessions, then return it in full
+    """
+    user_id = current_user["sub"]
+    parts: List[str] = []
+    async for delta in stream_ai_response(request.message, request.route_data):
+        parts.append(delta)
+        await websocket_manager.emit_ai_chunk(user_id, delta)
+    await websocket_manager.emit_ai_chunk(user_id, "", done=True)
+    
+    return ChatResponse(response="".join(parts))
+
+@router.post("/batch")
+async def submit_chat_batch(
+    request: BatchChatRequest,
+    current_user: Dict[str, Any] = Depends(require_admin)
+):
+    """
+    Submit non-interactive prompts (e.g. notification copy) to the OpenAI Batch API
+    """
+    return await submit_ai_batch(request.messages)
+
+@router.get("/batch/{batch_id}")
+async def get_chat_batch(
+    batch_id: str,
+    current_user: Dict[str, Any] = Depends(require_admin)
+):
+    """
+    Get batch status and responses once completed
+    """
+    return await get_ai_batch_results(batch_id)
+
 @router.get("/health")
 async def ai_health_check():
     """
@@ -2,44 +2,64 @@
 Authentication endpoints
 """
 
+import asyncio
 from fastapi import APIRouter, HTTPException, status, Depends
 from fastapi.security import HTTPAuthorizationCredentials
 from datetime import timedelta
-from typing import Dict, Any
+from typing import Dict, Any, Optional
+from cachetools import TTLCache
+from pymongo.errors import DuplicateKeyError
 
 from app.models.schemas import UserCreate, UserLogin, TokenResponse, UserResponse, User
 from app.core.security import security_manager, get_current_user
 from app.database.mongodb import get_users_collection
-from app.core.config import settings
+from app.core.config import ACCESS_TOKEN_EXPIRE_SECONDS
 
 router = APIRouter()
 
+# Short-lived cache of user documents for /me and /refresh
+_user_cache: TTLCache = TTLCache(maxsize=10_000, ttl=60)
+
+async def _fetch_user(user_id: str) -> Optional[Dict[str, Any]]:
+    """Fetch a user document by id, served from the TTL cache when fresh"""
+    user = _user_cache.get(user_id)
+    if user is None:
+        users_collection = get_users_collection()
+        user = await users_collection.find_one({"_id": user_id})
+        if user:
+            _user_cache[user_id] = user
+    return user
+
 @router.post("/register", response_model=TokenResponse, status_code=status.HTTP_201_CREATED)
 async def register(user_data: UserCreate):
     """Register a new user"""
     users_collection = get_users_collection()
     
-    # Check if user already exists
-    existing_user = await users_collection.find_one({"email": user_data.email})
-    if existing_user:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Email already registered"
-        )
-    
-    # Hash password
-    hashed_password = security_manager.get_password_hash(user_data.password)
+    # Hash password off the event loop
+    hashed_password = await asyncio.to_thread(
+        security_manager.get_password_hash, user_data.password
+    )
     
     # Create user document
-    user_dict = user_data.dict(exclude={"password"})
+    user_dict = user_data.model_dump(exclude={"password"})
     user_dict["hashed_password"] = hashed_password
     user_dict["role"] = "passenger"  # Default role
     user_dict["is_active"] = True
     
     user = User(**user_dict)
     
-    # Insert user
-    result = await users_collection.insert_one(user.dict(by_alias=True))
+    # Insert user (the unique email index rejects duplicates)
+    try:
+        result = await users_collection.insert_one({
+            **user.model_dump(by_alias=True),
+            "unread_notif_count": 0
+        })
+    except DuplicateKeyError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Email already registered"
+        )
+    
     user_dict["id"] = str(result.inserted_id)
     
     # Create access token
@@ -53,7 +73,7 @@ async def register(user_data: UserCreate):
     return TokenResponse(
         access_token=access_token,
         token_type="bearer",
-        expires_in=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+        expires_in=ACCESS_TOKEN_EXPIRE_SECONDS,
         user=user_response
     )
 
@@ -64,7 +84,9 @@ async def login(credentials: UserLogin):
     
     # Find user
     user = await users_collection.find_one({"email": credentials.email})
-    if not user or not security_manager.verify_password(credentials.password, user["hashed_password"]):
+    if not user or not await asyncio.to_thread(
+        security_manager.verify_password, credentials.password, user["hashed_password"]
+    ):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid email or password"
@@ -89,16 +111,14 @@ async def login(credentials: UserLogin):
     return TokenResponse(
         access_token=access_token,
         token_type="bearer",
-        expires_in=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+        expires_in=ACCESS_TOKEN_EXPIRE_SECONDS,
         user=user_response
     )
 
 @router.get("/me", response_model=UserResponse)
 async def get_current_user_info(current_user: Dict[str, Any] = Depends(get_current_user)):
     """Get current user information"""
-    users_collection = get_users_collection()
-    
-    user = await users_collection.find_one({"_id": current_user["sub"]})
+    user = await _fetch_user(current_user["sub"])
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -118,8 +138,12 @@ async def refresh_token(current_user: Dict[str, Any] = Depends(get_current_user)
     )
     
     # Get user info
-    users_collection = get_users_collection()
-    user = await users_collection.find_one({"_id": current_user["sub"]})
+    user = await _fetch_user(current_user["sub"])
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found"
+        )
     
     user_data = dict(user)
     user_data["id"] = str(user_data.pop("_id"))
@@ -128,6 +152,6 @@ async def refresh_token(current_user: Dict[str, Any] = Depends(get_current_user)
     return TokenResponse(
         access_token=access_token,
         token_type="bearer",
-        expires_in=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+        expires_in=ACCESS_TOKEN_EXPIRE_SECONDS,
         user=user_response
     )
\ No newline at end of file
@@ -5,14 +5,25 @@ Notifications API endpoints
 from fastapi import APIRouter, HTTPException, status, Depends, Query
 from typing import List, Optional, Dict, Any
 from datetime import datetime, timedelta
+from pymongo import ReturnDocument
 
-from app.models.schemas import Notification, NotificationType
+from app.models.schemas import Notification, NotificationType, model_projection
+from app.api.responses import MongoORJSONResponse
 from app.core.security import get_current_user
-from app.database.mongodb import get_notifications_collection
+from app.core.clock import get_request_time
+from app.database.mongodb import get_notifications_collection, get_users_collection
 
 router = APIRouter()
 
-@router.get("/", response_model=List[Notification])
+# Fields surfaced by the response model
+NOTIFICATION_PROJECTION = model_projection(Notification)
+
+@router.get(
+    "/",
+    response_model=None,
+    response_class=MongoORJSONResponse,
+    responses={200: {"model": List[Notification]}}
+)
 async def get_notifications(
     is_read: Optional[bool] = Query(default=None),
     notification_type: Optional[NotificationType] = Query(default=None, alias="type"),
@@ -29,33 +40,53 @@ async def get_notifications(
     if notification_type:
         filter_query["type"] = notification_type
     
-    notifications = await notifications_collection.find(filter_query) \
+    # The (user_id[, is_read], created_at) compound indexes serve the filter and sort
+    notifications = await notifications_collection.find(filter_query, NOTIFICATION_PROJECTION) \
         .sort("created_at", -1) \
         .limit(limit) \
-        .to_list(length=None)
-    
-    # Convert _id to id for response
-    for notification in notifications:
-        notification["id"] = str(notification.pop("_id"))
+        .batch_size(limit) \
+        .to_list(length=limit)
     
-    return notifications
+    # Mongo documents are serialized directly, skipping model validation
+    return MongoORJSONResponse(notifications)
 
 @router.get("/unread/count")
 async def get_unread_count(
     current_user: Dict[str, Any] = Depends(get_current_user)
 ):
     """Get count of unread notifications"""
-    notifications_collection = get_notifications_collection()
+    users_collection = get_users_collection()
     user_id = current_user["sub"]
     
+    # Read the cached counter maintained on insert/read/delete
+    user = await users_collection.find_one(
+        {"_id": user_id},
+        {"unread_notif_count": 1}
+    )
+    
+    if user and "unread_notif_count" in user:
+        return {"unread_count": user["unread_notif_count"]}
+    
+    # Counter not initialised yet (normally backfilled at startup): count once and store it
+    notifications_collection = get_notifications_collection()
     count = await notifications_collection.count_documents({
         "user_id": user_id,
         "is_read": False
     })
     
+    await users_collection.update_one(
+        {"_id": user_id, "unread_notif_count": {"$exists": False}},
+        {"$set": {"unread_notif_count": count}}
+    )
+    
     return {"unread_count": count}
 
-@router.get("/{notification_id}", response_model=Notification)
+@router.get(
+    "/{notification_id}",
+    response_model=None,
+    response_class=MongoORJSONResponse,
+    responses={200: {"model": Notification}}
+)
 async def get_notification(
     notification_id: str,
     current_user: Dict[str, Any] = Depends(get_current_user)
@@ -67,7 +98,7 @@ async def get_notification(
     notification = await notifications_collection.find_one({
         "_id": notification_id,
         "user_id": user_id
-    })
+    }, NOTIFICATION_PROJECTION)
     
     if not notification:
         raise HTTPException(
@@ -75,19 +106,20 @@ async def get_notification(
             detail="Notification not found"
         )
     
-    notification["id"] = str(notification.pop("_id"))
-    return notification
+    # Projected Mongo document is serialized directly, skipping model validation
+    return MongoORJSONResponse(notification)
 
 @router.patch("/{notification_id}/read", status_code=status.HTTP_204_NO_CONTENT)
 async def mark_notification_read(
     notification_id: str,
+    now: datetime = Depends(get_request_time),
     current_user: Dict[str, Any] = Depends(get_current_user)
 ):
     """Mark a notification as read"""
     notifications_collection = get_notifications_collection()
     user_id = current_user["sub"]
     
-    result = await notifications_collection.update_one(
+    previous = await notifications_collection.find_one_and_update(
         {
             "_id": notification_id,
             "user_id": user_id
@@ -95,19 +127,28 @@ async def mark_notification_read(
         {
             "$set": {
                 "is_read": True,
-                "updated_at": datetime.utcnow()
+                "updated_at": now
             }
-        }
+        },
+        projection={"is_read": 1},
+        return_document=ReturnDocument.BEFORE
     )
     
-    if result.modified_count == 0:
+    if not previous:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Notification not found"
         )
+    
+    if not previous.get("is_read"):
+        await get_users_collection().update_one(
+            {"_id": user_id, "unread_notif_count": {"$exists": True}},
+            {"$inc": {"unread_notif_count": -1}}
+        )
 
 @router.patch("/read-all", status_code=status.HTTP_204_NO_CONTENT)
 async def mark_all_notifications_read(
+    now: datetime = Depends(get_request_time),
     current_user: Dict[str, Any] = Depends(get_current_user)
 ):
     """Mark all notifications as read"""
@@ -122,10 +163,15 @@ async def mark_all_notifications_read(
         {
             "$set": {
                 "is_read": True,
-                "updated_at": datetime.utcnow()
+                "updated_at": now
             }
         }
     )
+    
+    await get_users_collection().update_one(
+        {"_id": user_id},
+        {"$set": {"unread_notif_count": 0}}
+    )
 
 @router.delete("/{notification_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_notification(
@@ -136,31 +182,54 @@ async def delete_notification(
     notifications_collection = get_notifications_collection()
     user_id = current_user["sub"]
     
-    result = await notifications_collection.delete_one({
-        "_id": notification_id,
-        "user_id": user_id
-    })
+    deleted = await notifications_collection.find_one_and_delete(
+        {
+            "_id": notification_id,
+            "user_id": user_id
+        },
+        projection={"is_read": 1}
+    )
     
-    if result.deleted_count == 0:
+    if not deleted:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Notification not found"
         )
+    
+    if not deleted.get("is_read"):
+        await get_users_collection().update_one(
+            {"_id": user_id, "unread_notif_count": {"$exists": True}},
+            {"$inc": {"unread_notif_count": -1}}
+        )
 
 @router.delete("/", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_old_notifications(
     days_old: int = Query(default=30, ge=1, le=365),
+    now: datetime = Depends(get_request_time),
     current_user: Dict[str, Any] = Depends(get_current_user)
 ):
     """Delete notifications older than specified days"""
     notifications_collection = get_notifications_collection()
     user_id = current_user["sub"]
     
-    cutoff_date = datetime.utcnow() - timedelta(days=days_old)
+    cutoff_date = now - timedelta(days=days_old)
+    
+    # Delete unread ones separately so the cached counter stays in sync
+    unread_result = await notifications_collection.delete_many({
+        "user_id": user_id,
+        "is_read": False,
+        "created_at": {"$lt": cutoff_date}
+    })
+    
+    if unread_result.deleted_count:
+        await get_users_collection().update_one(
+            {"_id": user_id, "unread_notif_count": {"$exists": True}},
+            {"$inc": {"unread_notif_count": -unread_result.deleted_count}}
+        )
     
     result = await notifications_collection.delete_many({
         "user_id": user_id,
         "created_at": {"$lt": cutoff_date}
     })
     
-    return {"deleted_count": result.deleted_count}
\ No newline at end of file
+    return {"deleted_count": unread_result.deleted_count + result.deleted_count}
\ No newline at end of file
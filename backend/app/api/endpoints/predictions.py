@@ -3,36 +3,56 @@ Prediction API endpoints
 """
 
 from fastapi import APIRouter, HTTPException, status, Depends, Query
-from datetime import datetime
+from datetime import datetime, timedelta
 from typing import List, Optional, Dict, Any
 
 from app.models.schemas import TripPrediction
 from app.core.security import get_current_user
+from app.core.clock import get_request_time
 from app.ml.prediction_engine import ml_engine
-from app.database.mongodb import get_trips_collection, get_routes_collection
+from app.database.mongodb import get_trips_collection
+from app.database.cache import get_route_cached
 
 router = APIRouter()
 
 @router.get("/trip/{trip_id}", response_model=TripPrediction)
 async def get_trip_prediction(
     trip_id: str,
+    include_factors: bool = Query(default=False),
     current_user: Dict[str, Any] = Depends(get_current_user)
 ):
     """Get delay prediction for a specific trip"""
     trips_collection = get_trips_collection()
     
-    # Get trip details
-    trip = await trips_collection.find_one({"_id": trip_id})
-    if not trip:
+    # Get trip details together with its route in one round-trip
+    result = await trips_collection.aggregate([
+        {"$match": {"_id": trip_id}},
+        {"$project": {"route_id": 1, "trip_start_time": 1}},
+        {
+            "$lookup": {
+                "from": "routes",
+                "localField": "route_id",
+                "foreignField": "_id",
+                "as": "route"
+            }
+        },
+        {"$unwind": {"path": "$route", "preserveNullAndEmptyArrays": True}}
+    ]).to_list(length=1)
+    
+    if not result:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Trip not found"
         )
     
+    trip = result[0]
+    
     # Get prediction
     prediction = await ml_engine.predict_delay(
         route_id=trip["route_id"],
-        trip_start_time=trip["trip_start_time"]
+        trip_start_time=trip["trip_start_time"],
+        route=trip.get("route"),
+        include_factors=include_factors
     )
     
     if not prediction:
@@ -50,14 +70,16 @@ async def get_trip_prediction(
 async def get_route_predictions(
     route_id: str,
     hours_ahead: int = Query(default=2, ge=1, le=24),
+    limit: int = Query(default=50, ge=1, le=100),
+    include_factors: bool = Query(default=False),
+    now: datetime = Depends(get_request_time),
     current_user: Dict[str, Any] = Depends(get_current_user)
 ):
     """Get delay predictions for all upcoming trips on a route"""
-    routes_collection = get_routes_collection()
     trips_collection = get_trips_collection()
     
     # Verify route exists
-    route = await routes_collection.find_one({"_id": route_id})
+    route = await get_route_cached(route_id)
     if not route:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -65,44 +87,50 @@ async def get_route_predictions(
         )
     
     # Get upcoming trips
-    from datetime import timedelta
-    end_time = datetime.utcnow() + timedelta(hours=hours_ahead)
+    end_time = now + timedelta(hours=hours_ahead)
     
     upcoming_trips = await trips_collection.find({
         "route_id": route_id,
         "trip_start_time": {
-            "$gte": datetime.utcnow(),
+            "$gte": now,
             "$lte": end_time
         },
         "status": {"$in": ["scheduled", "in_progress"]}
-    }).to_list(length=None)
+    }, {"trip_start_time": 1}) \
+        .sort("trip_start_time", 1) \
+        .limit(limit) \
+        .batch_size(limit) \
+        .to_list(length=limit)
     
-    predictions = []
+    # Predict all upcoming trips in one batched model call
+    predictions = await ml_engine.predict_delay_batch(
+        route_id,
+        [trip["trip_start_time"] for trip in upcoming_trips],
+        route=route,
+        include_factors=include_factors
+    )
     
-    for trip in upcoming_trips:
-        prediction = await ml_engine.predict_delay(
-            route_id=route_id,
-            trip_start_time=trip["trip_start_time"]
-        )
-        
-        if prediction:
-            prediction.trip_id = trip["_id"]
-            predictions.append(prediction)
+    # Results align with upcoming_trips; drop trips that could not be predicted
+    route_predictions = []
+    for trip, prediction in zip(upcoming_trips, predictions):
+        if prediction is None:
+            continue
+        prediction.trip_id = trip["_id"]
+        route_predictions.append(prediction)
     
-    return predictions
+    return route_predictions
 
 @router.post("/predict", response_model=TripPrediction)
 async def predict_custom_trip(
     route_id: str,
     trip_start_time: datetime,
     model_name: Optional[str] = "random_forest",
+    include_factors: bool = False,
     current_user: Dict[str, Any] = Depends(get_current_user)
 ):
     """Generate prediction for a custom trip scenario"""
-    routes_collection = get_routes_collection()
-    
     # Verify route exists
-    route = await routes_collection.find_one({"_id": route_id})
+    route = await get_route_cached(route_id)
     if not route:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -113,7 +141,9 @@ async def predict_custom_trip(
     prediction = await ml_engine.predict_delay(
         route_id=route_id,
         trip_start_time=trip_start_time,
-        model_name=model_name
+        model_name=model_name,
+        route=route,
+        include_factors=include_factors
     )
     
     if not prediction:
@@ -160,31 +190,68 @@ async def retrain_models(
 async def get_route_analytics(
     route_id: str,
     days_back: int = Query(default=7, ge=1, le=30),
+    now: datetime = Depends(get_request_time),
     current_user: Dict[str, Any] = Depends(get_current_user)
 ):
     """Get analytics for route performance"""
-    routes_collection = get_routes_collection()
     trips_collection = get_trips_collection()
     
     # Verify route exists
-    route = await routes_collection.find_one({"_id": route_id})
+    route = await get_route_cached(route_id)
     if not route:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Route not found"
         )
     
-    # Get historical trips
-    from datetime import timedelta
-    start_date = datetime.utcnow() - timedelta(days=days_back)
+    # Aggregate historical trips server-side
+    start_date = now - timedelta(days=days_back)
     
-    historical_trips = await trips_collection.find({
-        "route_id": route_id,
-        "trip_start_time": {"$gte": start_date},
-        "status": "completed"
-    }).to_list(length=None)
+    delay = {"$ifNull": ["$delay_minutes", 0]}
+    
+    def count_if(condition: Dict[str, Any]) -> Dict[str, Any]:
+        return {"$sum": {"$cond": [condition, 1, 0]}}
+    
+    pipeline = [
+        {
+            "$match": {
+                "route_id": route_id,
+                "trip_start_time": {"$gte": start_date},
+                "status": "completed"
+            }
+        },
+        {"$project": {"_id": 0, "delay_minutes": 1, "trip_start_time": 1}},
+        {
+            "$facet": {
+                "summary": [
+                    {
+                        "$group": {
+                            "_id": None,
+                            "total_trips": {"$sum": 1},
+                            "avg_delay": {"$avg": delay},
+                            "on_time": count_if({"$lte": [delay, 5]}),
+                            "slightly_delayed": count_if({"$and": [{"$gt": [delay, 5]}, {"$lte": [delay, 10]}]}),
+                            "moderately_delayed": count_if({"$and": [{"$gt": [delay, 10]}, {"$lte": [delay, 20]}]}),
+                            "severely_delayed": count_if({"$gt": [delay, 20]})
+                        }
+                    }
+                ],
+                "hourly": [
+                    {
+                        "$group": {
+                            "_id": {"$hour": "$trip_start_time"},
+                            "avg_delay": {"$avg": delay}
+                        }
+                    }
+                ]
+            }
+        }
+    ]
+    
+    result = await trips_collection.aggregate(pipeline).to_list(length=1)
+    summary = result[0]["summary"] if result else []
     
-    if not historical_trips:
+    if not summary:
         return {
             "route_id": route_id,
             "route_name": route.get("name", "Unknown"),
@@ -196,37 +263,25 @@ async def get_route_analytics(
             "peak_delay_hours": []
         }
     
-    # Calculate analytics
-    delays = [trip.get("delay_minutes", 0) for trip in historical_trips]
-    avg_delay = sum(delays) / len(delays) if delays else 0
+    summary = summary[0]
+    total_trips = summary["total_trips"]
+    avg_delay = summary["avg_delay"] or 0
     
     # On-time performance (delays <= 5 minutes)
-    on_time_trips = sum(1 for delay in delays if delay <= 5)
-    on_time_percentage = (on_time_trips / len(delays)) * 100 if delays else 100
+    on_time_percentage = (summary["on_time"] / total_trips) * 100
     
     # Delay distribution
     delay_ranges = {
-        "on_time": sum(1 for d in delays if d <= 5),
-        "slightly_delayed": sum(1 for d in delays if 5 < d <= 10),
-        "moderately_delayed": sum(1 for d in delays if 10 < d <= 20),
-        "severely_delayed": sum(1 for d in delays if d > 20)
+        "on_time": summary["on_time"],
+        "slightly_delayed": summary["slightly_delayed"],
+        "moderately_delayed": summary["moderately_delayed"],
+        "severely_delayed": summary["severely_delayed"]
     }
     
-    # Peak delay hours analysis
-    hour_delays = {}
-    for trip in historical_trips:
-        hour = trip["trip_start_time"].hour
-        delay = trip.get("delay_minutes", 0)
-        
-        if hour not in hour_delays:
-            hour_delays[hour] = []
-        hour_delays[hour].append(delay)
-    
-    # Calculate average delay per hour
+    # Average delay per hour
     hour_avg_delays = {
-        hour: sum(delays) / len(delays)
-        for hour, delays in hour_delays.items()
-        if delays
+        entry["_id"]: entry["avg_delay"]
+        for entry in result[0]["hourly"]
     }
     
     # Find peak delay hours (top 3)
@@ -240,7 +295,7 @@ async def get_route_analytics(
         "route_id": route_id,
         "route_name": route.get("name", "Unknown"),
         "analytics_period_days": days_back,
-        "total_trips": len(historical_trips),
+        "total_trips": total_trips,
         "average_delay_minutes": round(avg_delay, 2),
         "on_time_percentage": round(on_time_percentage, 1),
         "delay_distribution": delay_ranges,
@@ -3,33 +3,59 @@ Routes API endpoints
 """
 
 from fastapi import APIRouter, HTTPException, status, Depends, Query
+from pydantic import TypeAdapter
+from pymongo import ReturnDocument
 from typing import List, Optional, Dict, Any
 
-from app.models.schemas import Route, Stop
+from app.models.schemas import Route, Stop, model_projection
+from app.api.responses import MongoORJSONResponse, validated_list_response
 from app.core.security import get_current_user, require_admin
 from app.database.mongodb import get_routes_collection, get_stops_collection
+from app.database.cache import cache, get_route_cached, invalidate_route, list_key, ROUTES_LIST_PREFIX
 
 router = APIRouter()
 
-@router.get("/", response_model=List[Route])
+# Fields surfaced by the response models
+ROUTE_PROJECTION = model_projection(Route)
+STOP_PROJECTION = model_projection(Stop)
+
+# Precompiled list validator/serializer
+STOP_LIST_ADAPTER = TypeAdapter(List[Stop])
+
+@router.get(
+    "/",
+    response_model=None,
+    response_class=MongoORJSONResponse,
+    responses={200: {"model": List[Route]}}
+)
 async def get_routes(
     is_active: Optional[bool] = Query(default=None),
+    skip: int = Query(default=0, ge=0),
+    limit: int = Query(default=100, ge=1, le=500),
     current_user: Dict[str, Any] = Depends(get_current_user)
 ):
-    """Get all routes"""
+    """Get routes, paginated"""
     routes_collection = get_routes_collection()
     
     filter_query = {}
     if is_active is not None:
         filter_query["is_active"] = is_active
     
-    routes = await routes_collection.find(filter_query).to_list(length=None)
-    
-    # Convert _id to id for response
-    for route in routes:
-        route["id"] = str(route.pop("_id"))
+    async def load_routes():
+        return await routes_collection.find(filter_query, ROUTE_PROJECTION) \
+            .sort("_id", 1) \
+            .skip(skip) \
+            .limit(limit) \
+            .batch_size(limit) \
+            .to_list(length=limit)
+    
+    routes = await cache.get_or_load(
+        await list_key(ROUTES_LIST_PREFIX, is_active, skip, limit),
+        load_routes
+    )
     
-    return routes
+    # Mongo documents are serialized directly, skipping model validation
+    return MongoORJSONResponse(routes)
 
 @router.get("/{route_id}", response_model=Route)
 async def get_route(
@@ -37,46 +63,45 @@ async def get_route(
     current_user: Dict[str, Any] = Depends(get_current_user)
 ):
     """Get a specific route"""
-    routes_collection = get_routes_collection()
-    
-    route = await routes_collection.find_one({"_id": route_id})
+    route = await get_route_cached(route_id)
     if not route:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Route not found"
         )
     
-    route["id"] = str(route.pop("_id"))
     return route
 
-@router.get("/{route_id}/stops", response_model=List[Stop])
+@router.get(
+    "/{route_id}/stops",
+    response_model=None,
+    responses={200: {"model": List[Stop]}}
+)
 async def get_route_stops(
     route_id: str,
     current_user: Dict[str, Any] = Depends(get_current_user)
 ):
     """Get all stops for a route"""
-    routes_collection = get_routes_collection()
     stops_collection = get_stops_collection()
     
     # Get route
-    route = await routes_collection.find_one({"_id": route_id})
+    route = await get_route_cached(route_id)
     if not route:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Route not found"
         )
     
-    # Get stops in order
+    # Fetch all stops in one query, then restore route order
     stop_ids = route.get("stops", [])
-    stops = []
-    
-    for stop_id in stop_ids:
-        stop = await stops_collection.find_one({"_id": stop_id})
-        if stop:
-            stop["id"] = str(stop.pop("_id"))
-            stops.append(stop)
+    stops_data = {}
+    async for stop in stops_collection.find({"_id": {"$in": stop_ids}}, STOP_PROJECTION):
+        stops_data[stop["_id"]] = stop
     
-    return stops
+    return validated_list_response(
+        STOP_LIST_ADAPTER,
+        [stops_data[stop_id] for stop_id in stop_ids if stop_id in stops_data]
+    )
 
 @router.post("/", response_model=Route, status_code=status.HTTP_201_CREATED)
 async def create_route(
@@ -87,7 +112,7 @@ async def create_route(
     routes_collection = get_routes_collection()
     
     # Check if route code already exists
-    existing_route = await routes_collection.find_one({"code": route_data.code})
+    existing_route = await routes_collection.find_one({"code": route_data.code}, {"_id": 1})
     if existing_route:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -95,14 +120,12 @@ async def create_route(
         )
     
     # Insert route
-    route_dict = route_data.dict(by_alias=True)
-    result = await routes_collection.insert_one(route_dict)
-    
-    # Return created route
-    created_route = await routes_collection.find_one({"_id": result.inserted_id})
-    created_route["id"] = str(created_route.pop("_id"))
+    route_dict = route_data.model_dump(by_alias=True)
+    await routes_collection.insert_one(route_dict)
+    await invalidate_route()
     
-    return created_route
+    # Return the inserted document without re-reading it
+    return route_dict
 
 @router.put("/{route_id}", response_model=Route)
 async def update_route(
@@ -113,26 +136,22 @@ async def update_route(
     """Update a route (Admin only)"""
     routes_collection = get_routes_collection()
     
-    # Check if route exists
-    existing_route = await routes_collection.find_one({"_id": route_id})
-    if not existing_route:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Route not found"
-        )
-    
     # Update route
-    route_dict = route_data.dict(by_alias=True, exclude={"id"})
+    route_dict = route_data.model_dump(by_alias=True, exclude={"id"})
     route_dict["updated_at"] = route_data.updated_at
     
-    await routes_collection.update_one(
+    updated_route = await routes_collection.find_one_and_update(
         {"_id": route_id},
-        {"$set": route_dict}
+        {"$set": route_dict},
+        projection=ROUTE_PROJECTION,
+        return_document=ReturnDocument.AFTER
     )
-    
-    # Return updated route
-    updated_route = await routes_collection.find_one({"_id": route_id})
-    updated_route["id"] = str(updated_route.pop("_id"))
+    if not updated_route:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Route not found"
+        )
+    await invalidate_route(route_id)
     
     return updated_route
 
@@ -145,6 +164,7 @@ async def delete_route(
     routes_collection = get_routes_collection()
     
     result = await routes_collection.delete_one({"_id": route_id})
+    await invalidate_route(route_id)
     
     if result.deleted_count == 0:
         raise HTTPException(
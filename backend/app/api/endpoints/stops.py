@@ -3,81 +3,111 @@ Stops API endpoints
 """
 
 from fastapi import APIRouter, HTTPException, status, Depends, Query
+from pydantic import TypeAdapter
+from pymongo import ReturnDocument
 from typing import List, Optional, Dict, Any
 
-from app.models.schemas import Stop
+from app.models.schemas import Stop, model_projection
+from app.api.responses import MongoORJSONResponse, validated_list_response
 from app.core.security import get_current_user, require_admin
-from app.database.mongodb import get_stops_collection
+from app.database.mongodb import get_stops_collection, stop_geo_point, STOP_GEO_FIELD
+from app.database.cache import cache, get_stop_cached, invalidate_stop, list_key, STOPS_LIST_PREFIX
 
 router = APIRouter()
 
-@router.get("/", response_model=List[Stop])
+# Fields surfaced by the response model
+STOP_PROJECTION = model_projection(Stop)
+
+# Precompiled list validator/serializer
+STOP_LIST_ADAPTER = TypeAdapter(List[Stop])
+
+@router.get(
+    "/",
+    response_model=None,
+    response_class=MongoORJSONResponse,
+    responses={200: {"model": List[Stop]}}
+)
 async def get_stops(
     is_active: Optional[bool] = Query(default=None),
+    skip: int = Query(default=0, ge=0),
+    limit: int = Query(default=100, ge=1, le=500),
     current_user: Dict[str, Any] = Depends(get_current_user)
 ):
-    """Get all stops"""
+    """Get stops, paginated"""
     stops_collection = get_stops_collection()
     
     filter_query = {}
     if is_active is not None:
         filter_query["is_active"] = is_active
     
-    stops = await stops_collection.find(filter_query).to_list(length=None)
-    
-    # Convert _id to id for response
-    for stop in stops:
-        stop["id"] = str(stop.pop("_id"))
-    
-    return stops
-
-@router.get("/{stop_id}", response_model=Stop)
-async def get_stop(
-    stop_id: str,
-    current_user: Dict[str, Any] = Depends(get_current_user)
-):
-    """Get a specific stop"""
-    stops_collection = get_stops_collection()
-    
-    stop = await stops_collection.find_one({"_id": stop_id})
-    if not stop:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Stop not found"
-        )
+    async def load_stops():
+        return await stops_collection.find(filter_query, STOP_PROJECTION) \
+            .sort("_id", 1) \
+            .skip(skip) \
+            .limit(limit) \
+            .batch_size(limit) \
+            .to_list(length=limit)
+    
+    stops = await cache.get_or_load(
+        await list_key(STOPS_LIST_PREFIX, is_active, skip, limit),
+        load_stops
+    )
     
-    stop["id"] = str(stop.pop("_id"))
-    return stop
+    # Mongo documents are serialized directly, skipping model validation
+    return MongoORJSONResponse(stops)
 
-@router.get("/nearby", response_model=List[Stop])
+@router.get(
+    "/nearby",
+    response_model=None,
+    responses={200: {"model": List[Stop]}}
+)
 async def get_nearby_stops(
     latitude: float = Query(..., ge=-90, le=90),
     longitude: float = Query(..., ge=-180, le=180),
     radius_km: float = Query(default=1.0, ge=0.1, le=50),
+    limit: int = Query(default=50, ge=1, le=200),
     current_user: Dict[str, Any] = Depends(get_current_user)
 ):
-    """Get stops within a radius of a location"""
+    """Get the closest stops within a radius of a location"""
     stops_collection = get_stops_collection()
     
-    # MongoDB geospatial query
-    nearby_stops = await stops_collection.find({
-        "location": {
-            "$near": {
-                "$geometry": {
+    # MongoDB geospatial aggregation, nearest first
+    pipeline = [
+        {
+            "$geoNear": {
+                "near": {
                     "type": "Point",
                     "coordinates": [longitude, latitude]
                 },
-                "$maxDistance": radius_km * 1000  # Convert km to meters
+                "key": STOP_GEO_FIELD,
+                "distanceField": "distance_m",
+                "maxDistance": radius_km * 1000,  # Convert km to meters
+                "spherical": True,
+                "query": {"is_active": True}
             }
         },
-        "is_active": True
-    }).to_list(length=None)
+        {"$limit": limit},
+        {"$project": STOP_PROJECTION}
+    ]
+    
+    nearby_stops = await stops_collection.aggregate(pipeline).to_list(length=limit)
     
-    # Convert _id to id for response
-    for stop in nearby_stops:
-        stop["id"] = str(stop.pop("_id"))
+    return validated_list_response(STOP_LIST_ADAPTER, nearby_stops)
+
+@router.get("/{stop_id}", response_model=Stop)
+async def get_stop(
+    stop_id: str,
+    current_user: Dict[str, Any] = Depends(get_current_user)
+):
+    """Get a specific stop"""
+    stop = await get_stop_cached(stop_id)
+    if not stop:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Stop not found"
+        )
     
-    return nearby_stops
+    return stop
 
 @router.post("/", response_model=Stop, status_code=status.HTTP_201_CREATED)
 async def create_stop(
@@ -88,7 +118,7 @@ async def create_stop(
     stops_collection = get_stops_collection()
     
     # Check if stop code already exists
-    existing_stop = await stops_collection.find_one({"code": stop_data.code})
+    existing_stop = await stops_collection.find_one({"code": stop_data.code}, {"_id": 1})
     if existing_stop:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -96,14 +126,15 @@ async def create_stop(
         )
     
     # Insert stop
-    stop_dict = stop_data.dict(by_alias=True)
-    result = await stops_collection.insert_one(stop_dict)
-    
-    # Return created stop
-    created_stop = await stops_collection.find_one({"_id": result.inserted_id})
-    created_stop["id"] = str(created_stop.pop("_id"))
-    
-    return created_stop
+    stop_dict = stop_data.model_dump(by_alias=True)
+    await stops_collection.insert_one({
+        **stop_dict,
+        STOP_GEO_FIELD: stop_geo_point(stop_dict["location"])
+    })
+    await invalidate_stop()
+    
+    # Return the inserted document without re-reading it
+    return stop_dict
 
 @router.put("/{stop_id}", response_model=Stop)
 async def update_stop(
@@ -114,26 +145,23 @@ async def update_stop(
     """Update a stop (Admin only)"""
     stops_collection = get_stops_collection()
     
-    # Check if stop exists
-    existing_stop = await stops_collection.find_one({"_id": stop_id})
-    if not existing_stop:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Stop not found"
-        )
-    
     # Update stop
-    stop_dict = stop_data.dict(by_alias=True, exclude={"id"})
+    stop_dict = stop_data.model_dump(by_alias=True, exclude={"id"})
     stop_dict["updated_at"] = stop_data.updated_at
+    stop_dict[STOP_GEO_FIELD] = stop_geo_point(stop_dict["location"])
     
-    await stops_collection.update_one(
+    updated_stop = await stops_collection.find_one_and_update(
         {"_id": stop_id},
-        {"$set": stop_dict}
+        {"$set": stop_dict},
+        projection=STOP_PROJECTION,
+        return_document=ReturnDocument.AFTER
     )
-    
-    # Return updated stop
-    updated_stop = await stops_collection.find_one({"_id": stop_id})
-    updated_stop["id"] = str(updated_stop.pop("_id"))
+    if not updated_stop:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Stop not found"
+        )
+    await invalidate_stop(stop_id)
     
     return updated_stop
 
@@ -146,6 +174,7 @@ async def delete_stop(
     stops_collection = get_stops_collection()
     
     result = await stops_collection.delete_one({"_id": stop_id})
+    await invalidate_stop(stop_id)
     
     if result.deleted_count == 0:
         raise HTTPException(
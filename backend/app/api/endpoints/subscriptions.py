@@ -2,17 +2,34 @@
 Subscriptions API endpoints
 """
 
-from fastapi import APIRouter, HTTPException, status, Depends
+from fastapi import APIRouter, HTTPException, status, Depends, Query
+from pydantic import TypeAdapter
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
 from typing import List, Dict, Any
+from datetime import datetime
 
-from app.models.schemas import Subscription, SubscriptionCreate
+from app.models.schemas import Subscription, SubscriptionCreate, model_projection
+from app.api.responses import MongoORJSONResponse, validated_list_response
 from app.core.security import get_current_user
-from app.database.mongodb import get_subscriptions_collection, get_routes_collection
+from app.database.mongodb import get_subscriptions_collection
+from app.database.cache import get_route_cached
 
 router = APIRouter()
 
-@router.get("/", response_model=List[Subscription])
+# Fields surfaced by the response model
+SUBSCRIPTION_PROJECTION = model_projection(Subscription)
+
+# Precompiled list validator/serializer
+SUBSCRIPTION_LIST_ADAPTER = TypeAdapter(List[Subscription])
+
+@router.get(
+    "/",
+    response_model=None,
+    responses={200: {"model": List[Subscription]}}
+)
 async def get_subscriptions(
+    limit: int = Query(default=100, ge=1, le=500),
     current_user: Dict[str, Any] = Depends(get_current_user)
 ):
     """Get user's subscriptions"""
@@ -22,13 +39,12 @@ async def get_subscriptions(
     subscriptions = await subscriptions_collection.find({
         "user_id": user_id,
         "is_active": True
-    }).to_list(length=None)
+    }, SUBSCRIPTION_PROJECTION) \
+        .limit(limit) \
+        .batch_size(limit) \
+        .to_list(length=limit)
     
-    # Convert _id to id for response
-    for subscription in subscriptions:
-        subscription["id"] = str(subscription.pop("_id"))
-    
-    return subscriptions
+    return validated_list_response(SUBSCRIPTION_LIST_ADAPTER, subscriptions)
 
 @router.post("/", response_model=Subscription, status_code=status.HTTP_201_CREATED)
 async def create_subscription(
@@ -37,31 +53,19 @@ async def create_subscription(
 ):
     """Create a new subscription"""
     subscriptions_collection = get_subscriptions_collection()
-    routes_collection = get_routes_collection()
     user_id = current_user["sub"]
     
     # Verify route exists
-    route = await routes_collection.find_one({"_id": subscription_data.route_id})
+    route = await get_route_cached(subscription_data.route_id)
     if not route:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Route not found"
         )
     
-    # Check if subscription already exists
-    existing_subscription = await subscriptions_collection.find_one({
-        "user_id": user_id,
-        "route_id": subscription_data.route_id,
-        "is_active": True
-    })
-    
-    if existing_subscription:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Already subscribed to this route"
-        )
-    
-    # Create subscription
+    # Create the subscription, or reactivate a cancelled one, in one upsert.
+    # An active subscription doesn't match the filter, so the upsert's insert
+    # collides with the unique (user_id, route_id) index instead.
     subscription = Subscription(
         user_id=user_id,
         route_id=subscription_data.route_id,
@@ -69,16 +73,42 @@ async def create_subscription(
         is_active=True
     )
     
-    subscription_dict = subscription.dict(by_alias=True)
-    result = await subscriptions_collection.insert_one(subscription_dict)
-    
-    # Return created subscription
-    created_subscription = await subscriptions_collection.find_one({"_id": result.inserted_id})
-    created_subscription["id"] = str(created_subscription.pop("_id"))
+    try:
+        created_subscription = await subscriptions_collection.find_one_and_update(
+            {
+                "user_id": user_id,
+                "route_id": subscription_data.route_id,
+                "is_active": {"$ne": True}
+            },
+            {
+                "$set": {
+                    "stop_ids": subscription.stop_ids,
+                    "is_active": True,
+                    "updated_at": subscription.updated_at
+                },
+                "$setOnInsert": {
+                    "_id": subscription.id,
+                    "created_at": subscription.created_at
+                }
+            },
+            projection=SUBSCRIPTION_PROJECTION,
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+    except DuplicateKeyError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Already subscribed to this route"
+        )
     
     return created_subscription
 
-@router.get("/{subscription_id}", response_model=Subscription)
+@router.get(
+    "/{subscription_id}",
+    response_model=None,
+    response_class=MongoORJSONResponse,
+    responses={200: {"model": Subscription}}
+)
 async def get_subscription(
     subscription_id: str,
     current_user: Dict[str, Any] = Depends(get_current_user)
@@ -90,7 +120,7 @@ async def get_subscription(
     subscription = await subscriptions_collection.find_one({
         "_id": subscription_id,
         "user_id": user_id
-    })
+    }, SUBSCRIPTION_PROJECTION)
     
     if not subscription:
         raise HTTPException(
@@ -98,8 +128,8 @@ async def get_subscription(
             detail="Subscription not found"
         )
     
-    subscription["id"] = str(subscription.pop("_id"))
-    return subscription
+    # Projected Mongo document is serialized directly, skipping model validation
+    return MongoORJSONResponse(subscription)
 
 @router.put("/{subscription_id}", response_model=Subscription)
 async def update_subscription(
@@ -111,32 +141,24 @@ async def update_subscription(
     subscriptions_collection = get_subscriptions_collection()
     user_id = current_user["sub"]
     
-    # Check if subscription exists and belongs to user
-    existing_subscription = await subscriptions_collection.find_one({
-        "_id": subscription_id,
-        "user_id": user_id
-    })
-    
-    if not existing_subscription:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Subscription not found"
-        )
-    
-    # Update subscription
-    await subscriptions_collection.update_one(
-        {"_id": subscription_id},
+    # Update the subscription if it belongs to the user, returning the new document
+    updated_subscription = await subscriptions_collection.find_one_and_update(
+        {"_id": subscription_id, "user_id": user_id},
         {
             "$set": {
                 "stop_ids": subscription_data.stop_ids,
-                "updated_at": subscription_data.updated_at
+                "updated_at": datetime.utcnow()
             }
-        }
+        },
+        projection=SUBSCRIPTION_PROJECTION,
+        return_document=ReturnDocument.AFTER
     )
     
-    # Return updated subscription
-    updated_subscription = await subscriptions_collection.find_one({"_id": subscription_id})
-    updated_subscription["id"] = str(updated_subscription.pop("_id"))
+    if not updated_subscription:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Subscription not found"
+        )
     
     return updated_subscription
 
@@ -157,7 +179,7 @@ async def delete_subscription(
         {
             "$set": {
                 "is_active": False,
-                "updated_at": subscription_data.updated_at
+                "updated_at": datetime.utcnow()
             }
         }
     )
@@ -3,16 +3,29 @@ Trips API endpoints
 """
 
 from fastapi import APIRouter, HTTPException, status, Depends, Query
+from pydantic import TypeAdapter
+from pymongo import ReturnDocument
 from typing import List, Optional, Dict, Any
 from datetime import datetime
 
-from app.models.schemas import Trip, TripStatus
+from app.models.schemas import Trip, TripStatus, model_projection
+from app.api.responses import MongoORJSONResponse, streaming_list_response
 from app.core.security import get_current_user, require_admin
 from app.database.mongodb import get_trips_collection
 
 router = APIRouter()
 
-@router.get("/", response_model=List[Trip])
+# Fields surfaced by the response model
+TRIP_PROJECTION = model_projection(Trip)
+
+# Precompiled per-document validator/serializer for streamed lists
+TRIP_ADAPTER = TypeAdapter(Trip)
+
+@router.get(
+    "/",
+    response_model=None,
+    responses={200: {"model": List[Trip]}}
+)
 async def get_trips(
     route_id: Optional[str] = Query(default=None),
     status_filter: Optional[TripStatus] = Query(default=None, alias="status"),
@@ -28,32 +41,38 @@ async def get_trips(
     if status_filter:
         filter_query["status"] = status_filter
     
-    trips = await trips_collection.find(filter_query).limit(limit).to_list(length=None)
+    trips = trips_collection.find(filter_query, TRIP_PROJECTION) \
+        .limit(limit) \
+        .batch_size(limit)
     
-    # Convert _id to id for response
-    for trip in trips:
-        trip["id"] = str(trip.pop("_id"))
-    
-    return trips
+    return streaming_list_response(TRIP_ADAPTER, trips)
 
-@router.get("/active", response_model=List[Trip])
+@router.get(
+    "/active",
+    response_model=None,
+    responses={200: {"model": List[Trip]}}
+)
 async def get_active_trips(
+    limit: int = Query(default=500, ge=1, le=1000),
     current_user: Dict[str, Any] = Depends(get_current_user)
 ):
-    """Get all currently active trips"""
+    """Get currently active trips"""
     trips_collection = get_trips_collection()
     
-    active_trips = await trips_collection.find({
+    active_trips = trips_collection.find({
         "status": {"$in": ["scheduled", "in_progress"]}
-    }).to_list(length=None)
-    
-    # Convert _id to id for response
-    for trip in active_trips:
-        trip["id"] = str(trip.pop("_id"))
+    }, TRIP_PROJECTION) \
+        .limit(limit) \
+        .batch_size(min(limit, 200))
     
-    return active_trips
+    return streaming_list_response(TRIP_ADAPTER, active_trips)
 
-@router.get("/{trip_id}", response_model=Trip)
+@router.get(
+    "/{trip_id}",
+    response_model=None,
+    response_class=MongoORJSONResponse,
+    responses={200: {"model": Trip}}
+)
 async def get_trip(
     trip_id: str,
     current_user: Dict[str, Any] = Depends(get_current_user)
@@ -61,15 +80,15 @@ async def get_trip(
     """Get a specific trip"""
     trips_collection = get_trips_collection()
     
-    trip = await trips_collection.find_one({"_id": trip_id})
+    trip = await trips_collection.find_one({"_id": trip_id}, TRIP_PROJECTION)
     if not trip:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Trip not found"
         )
     
-    trip["id"] = str(trip.pop("_id"))
-    return trip
+    # Projected Mongo document is serialized directly, skipping model validation
+    return MongoORJSONResponse(trip)
 
 @router.post("/", response_model=Trip, status_code=status.HTTP_201_CREATED)
 async def create_trip(
@@ -80,14 +99,11 @@ async def create_trip(
     trips_collection = get_trips_collection()
     
     # Insert trip
-    trip_dict = trip_data.dict(by_alias=True)
-    result = await trips_collection.insert_one(trip_dict)
+    trip_dict = trip_data.model_dump(by_alias=True)
+    await trips_collection.insert_one(trip_dict)
     
-    # Return created trip
-    created_trip = await trips_collection.find_one({"_id": result.inserted_id})
-    created_trip["id"] = str(created_trip.pop("_id"))
-    
-    return created_trip
+    # Return the inserted document without re-reading it
+    return trip_dict
 
 @router.put("/{trip_id}", response_model=Trip)
 async def update_trip(
@@ -98,26 +114,21 @@ async def update_trip(
     """Update a trip (Admin only)"""
     trips_collection = get_trips_collection()
     
-    # Check if trip exists
-    existing_trip = await trips_collection.find_one({"_id": trip_id})
-    if not existing_trip:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Trip not found"
-        )
-    
     # Update trip
-    trip_dict = trip_data.dict(by_alias=True, exclude={"id"})
+    trip_dict = trip_data.model_dump(by_alias=True, exclude={"id"})
     trip_dict["updated_at"] = trip_data.updated_at
     
-    await trips_collection.update_one(
+    updated_trip = await trips_collection.find_one_and_update(
         {"_id": trip_id},
-        {"$set": trip_dict}
+        {"$set": trip_dict},
+        projection=TRIP_PROJECTION,
+        return_document=ReturnDocument.AFTER
     )
-    
-    # Return updated trip
-    updated_trip = await trips_collection.find_one({"_id": trip_id})
-    updated_trip["id"] = str(updated_trip.pop("_id"))
+    if not updated_trip:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Trip not found"
+        )
     
     return updated_trip
 
@@ -4,7 +4,7 @@ WebSocket API endpoints for real-time communication
 
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.responses import JSONResponse
-from datetime import datetime
+import time
 from typing import Dict, Any
 
 from app.core.security import get_current_user
@@ -29,7 +29,7 @@ async def get_websocket_stats(
     return {
         "websocket": ws_stats,
         "realtime_service": rt_stats,
-        "timestamp": datetime.utcnow()
+        "timestamp_ms": int(time.time() * 1000)
     }
 
 @router.get("/health")
@@ -44,7 +44,7 @@ async def websocket_health_check() -> Dict[str, Any]:
         "websocket_active": True,
         "total_connections": ws_stats["total_connections"],
         "uptime_seconds": ws_stats["uptime_seconds"],
-        "timestamp": datetime.utcnow()
+        "timestamp_ms": int(time.time() * 1000)
     }
 
 @router.post("/broadcast")
@@ -90,9 +90,9 @@ async def get_active_connections(
     return {
         "summary": stats,
         "details": {
-            "user_sessions": len(websocket_manager.user_sessions),
-            "route_subscribers": len(websocket_manager.route_subscribers),
-            "trip_subscribers": len(websocket_manager.trip_subscribers)
+            "user_sessions": stats["unique_users"],
+            "route_subscribers": stats["route_subscriptions"],
+            "trip_subscribers": stats["trip_subscriptions"]
         },
-        "timestamp": datetime.utcnow()
+        "timestamp_ms": int(time.time() * 1000)
     }
\ No newline at end of file
@@ -0,0 +1,60 @@
+"""
+Shared API response classes
+"""
+
+import logging
+from typing import Any, AsyncIterable, AsyncIterator, Iterable
+
+import orjson
+from fastapi.responses import ORJSONResponse, Response, StreamingResponse
+from pydantic import TypeAdapter, ValidationError
+
+logger = logging.getLogger(__name__)
+
+class MongoORJSONResponse(ORJSONResponse):
+    """ORJSONResponse that also serializes BSON types such as ObjectId"""
+    
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(
+            content,
+            default=str,
+            option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+        )
+
+def validated_list_response(adapter: TypeAdapter, documents: Iterable[Any]) -> Response:
+    """Validate documents once with a precompiled adapter and encode in pydantic-core"""
+    return Response(
+        content=adapter.dump_json(adapter.validate_python(documents), by_alias=True),
+        media_type="application/json"
+    )
+
+def streaming_list_response(adapter: TypeAdapter, documents: AsyncIterable[Any]) -> StreamingResponse:
+    """Stream a JSON array, validating and encoding one document at a time"""
+    async def encode() -> AsyncIterator[bytes]:
+        separator = b"["
+        async for document in documents:
+            # Headers are already sent: skip invalid documents so the array stays well-formed
+            try:
+                encoded = adapter.dump_json(adapter.validate_python(document), by_alias=True)
+            except ValidationError as e:
+                document_id = document.get("_id") if isinstance(document, dict) else None
+                logger.error(f"Skipping invalid document {document_id} in streamed list: {e}")
+                continue
+            yield separator + encoded
+            separator = b","
+        yield b"[]" if separator == b"[" else b"]"
+    
+    return StreamingResponse(encode(), media_type="application/json")
+
+def sse_response(events: AsyncIterable[Any]) -> StreamingResponse:
+    """Stream server-sent events, one JSON-encoded data line per event, ending with [DONE]"""
+    async def encode() -> AsyncIterator[bytes]:
+        async for event in events:
+            yield b"data: " + orjson.dumps(event) + b"\n\n"
+        yield b"data: [DONE]\n\n"
+    
+    return StreamingResponse(
+        encode(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -0,0 +1,13 @@
+"""
+Time helpers shared across the API
+"""
+
+from datetime import datetime, timezone
+
+def utc_now() -> datetime:
+    """Current time as a timezone-aware UTC datetime"""
+    return datetime.now(timezone.utc)
+
+def get_request_time() -> datetime:
+    """Dependency providing one timestamp per request (FastAPI caches it)"""
+    return utc_now()
@@ -22,6 +22,10 @@ class Settings(BaseSettings):
     SECRET_KEY: str = "your-secret-key-change-in-production"
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    BCRYPT_ROUNDS: int = 12
+    ARGON2_TIME_COST: int = 2
+    ARGON2_MEMORY_COST: int = 19456  # KiB
+    ARGON2_PARALLELISM: int = 1
     
     # CORS
     ALLOWED_ORIGINS: List[str] = [
@@ -34,9 +38,15 @@ class Settings(BaseSettings):
     # Database
     MONGODB_URL: str = "mongodb://localhost:27017"
     DATABASE_NAME: str = "bus_notification_system"
+    MONGODB_MIN_POOL_SIZE: int = 10
+    MONGODB_MAX_POOL_SIZE: int = 50
+    MONGODB_MAX_IDLE_TIME_MS: int = 30000
+    MONGODB_SERVER_SELECTION_TIMEOUT_MS: int = 3000
+    MONGODB_COMPRESSORS: str = "zstd,zlib"  # wire compression, in preference order
     
     # Redis
     REDIS_URL: str = "redis://localhost:6379"
+    CACHE_TTL_SECONDS: int = 300
     
     # WebSocket
     WEBSOCKET_UPDATE_INTERVAL: int = 10  # seconds
@@ -90,7 +100,17 @@ class Settings(BaseSettings):
 # Create settings instance
 settings = Settings()
 
-# Ensure required directories exist
-settings.MODELS_DIR.mkdir(exist_ok=True)
-settings.DATA_DIR.mkdir(exist_ok=True)
-settings.LOGS_DIR.mkdir(exist_ok=True)
\ No newline at end of file
+# Hot-path values bound once as plain constants
+SECRET_KEY: str = settings.SECRET_KEY
+ALGORITHM: str = settings.ALGORITHM
+ACCESS_TOKEN_EXPIRE_MINUTES: int = settings.ACCESS_TOKEN_EXPIRE_MINUTES
+ACCESS_TOKEN_EXPIRE_SECONDS: int = ACCESS_TOKEN_EXPIRE_MINUTES * 60
+MONGODB_URL: str = settings.MONGODB_URL
+DATABASE_NAME: str = settings.DATABASE_NAME
+CACHE_TTL_SECONDS: int = settings.CACHE_TTL_SECONDS
+
+def ensure_directories():
+    """Create required directories (called before the first write, not on import)"""
+    settings.MODELS_DIR.mkdir(exist_ok=True)
+    settings.DATA_DIR.mkdir(exist_ok=True)
+    settings.LOGS_DIR.mkdir(exist_ok=True)
\ No newline at end of file
@@ -2,35 +2,53 @@
 Authentication and security utilities
 """
 
+import base64
+import binascii
+import functools
+import hashlib
+import time
 from datetime import datetime, timedelta
 from typing import Optional, Dict, Any
+import orjson
+from cachetools import TTLCache
 from jose import JWTError, jwt
-from passlib.context import CryptContext
-from fastapi import HTTPException, status, Depends
-from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from app.core.config import settings
+from fastapi import HTTPException, status, Depends, Request
+from app.core.config import settings, SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES
 
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
-# HTTP Bearer token
-security = HTTPBearer()
+@functools.lru_cache(maxsize=None)
+def get_pwd_context():
+    """Password hashing context, built on first use (argon2id for new hashes; existing bcrypt hashes still verify)"""
+    from passlib.context import CryptContext
+    
+    return CryptContext(
+        schemes=["argon2", "bcrypt"],
+        deprecated="auto",
+        argon2__type="ID",
+        argon2__time_cost=settings.ARGON2_TIME_COST,
+        argon2__memory_cost=settings.ARGON2_MEMORY_COST,
+        argon2__parallelism=settings.ARGON2_PARALLELISM,
+        bcrypt__rounds=settings.BCRYPT_ROUNDS
+    )
 
 class SecurityManager:
     """Handles authentication and authorization"""
     
     def __init__(self):
-        self.secret_key = settings.SECRET_KEY
-        self.algorithm = settings.ALGORITHM
-        self.access_token_expire_minutes = settings.ACCESS_TOKEN_EXPIRE_MINUTES
+        self.secret_key = SECRET_KEY
+        self.algorithm = ALGORITHM
+        self.access_token_expire_minutes = ACCESS_TOKEN_EXPIRE_MINUTES
+        
+        # Decoded claims keyed by token digest; short TTL bounds staleness.
+        # Only touched from the event loop (auth middleware, socket connect).
+        self._claims_cache: TTLCache = TTLCache(maxsize=50_000, ttl=30)
     
     def verify_password(self, plain_password: str, hashed_password: str) -> bool:
         """Verify a plain password against a hashed password"""
-        return pwd_context.verify(plain_password, hashed_password)
+        return get_pwd_context().verify(plain_password, hashed_password)
     
     def get_password_hash(self, password: str) -> str:
         """Generate password hash"""
-        return pwd_context.hash(password)
+        return get_pwd_context().hash(password)
     
     def create_access_token(self, data: Dict[str, Any], expires_delta: Optional[timedelta] = None) -> str:
         """Create JWT access token"""
@@ -47,19 +65,40 @@ class SecurityManager:
     
     def verify_token(self, token: str) -> Dict[str, Any]:
         """Verify and decode JWT token"""
+        cache_key = hashlib.blake2b(token.encode(), digest_size=16).digest()
+        
+        payload = self._claims_cache.get(cache_key)
+        if payload is not None and payload.get("exp", 0) > time.time():
+            return payload
+        
         try:
+            # Reject expired tokens before paying for signature verification
+            if self._unverified_exp(token) <= time.time():
+                raise JWTError("Signature has expired")
             payload = jwt.decode(token, self.secret_key, algorithms=[self.algorithm])
-            return payload
         except JWTError:
+            self._claims_cache.pop(cache_key, None)
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid authentication credentials",
                 headers={"WWW-Authenticate": "Bearer"},
             )
+        
+        self._claims_cache[cache_key] = payload
+        return payload
+    
+    @staticmethod
+    def _unverified_exp(token: str) -> float:
+        """Read the exp claim without verifying the signature (inf if absent)"""
+        try:
+            payload_b64 = token.split(".")[1]
+            claims = orjson.loads(base64.urlsafe_b64decode(payload_b64 + "=" * (-len(payload_b64) % 4)))
+            return float(claims.get("exp", float("inf")))
+        except (IndexError, ValueError, TypeError, AttributeError, binascii.Error, orjson.JSONDecodeError):
+            raise JWTError("Malformed token")
     
-    def get_current_user(self, credentials: HTTPAuthorizationCredentials = Depends(security)) -> Dict[str, Any]:
+    def authenticate(self, token: str) -> Dict[str, Any]:
         """Get current authenticated user from token"""
-        token = credentials.credentials
         payload = self.verify_token(token)
         
         user_id = payload.get("sub")
@@ -70,31 +109,69 @@ class SecurityManager:
             )
         
         return payload
-    
-    def require_role(self, required_role: str):
-        """Decorator to require specific role"""
-        def role_checker(current_user: Dict[str, Any] = Depends(self.get_current_user)):
-            user_role = current_user.get("role", "passenger")
-            if user_role != required_role and user_role != "admin":
-                raise HTTPException(
-                    status_code=status.HTTP_403_FORBIDDEN,
-                    detail="Insufficient permissions"
-                )
-            return current_user
-        return role_checker
 
 # Create security manager instance
 security_manager = SecurityManager()
 
+# Roles accepted by each role dependency (admin passes every check)
+ADMIN_ROLES = frozenset({"admin"})
+PASSENGER_ROLES = frozenset({"passenger", "admin"})
+
+class AuthMiddleware:
+    """ASGI middleware that authenticates the Bearer token once per request into request.state"""
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            state = scope.setdefault("state", {})
+            state["user"] = None
+            state["auth_error"] = None
+            
+            for name, value in scope["headers"]:
+                if name == b"authorization":
+                    scheme, _, token = value.decode("latin-1").partition(" ")
+                    if scheme.lower() == "bearer" and token:
+                        try:
+                            state["user"] = security_manager.authenticate(token)
+                        except HTTPException as e:
+                            state["auth_error"] = e.detail
+                    break
+        
+        await self.app(scope, receive, send)
+
 # Common dependencies
-def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)) -> Dict[str, Any]:
-    """Dependency to get current user"""
-    return security_manager.get_current_user(credentials)
+async def get_current_user(request: Request) -> Dict[str, Any]:
+    """Dependency to get the user authenticated by AuthMiddleware"""
+    user = request.state.user
+    if user is None:
+        if request.state.auth_error:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail=request.state.auth_error,
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authenticated"
+        )
+    return user
 
-def require_admin(current_user: Dict[str, Any] = Depends(get_current_user)) -> Dict[str, Any]:
+async def require_admin(current_user: Dict[str, Any] = Depends(get_current_user)) -> Dict[str, Any]:
     """Dependency to require admin role"""
-    return security_manager.require_role("admin")(current_user)
+    if current_user.get("role", "passenger") not in ADMIN_ROLES:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Insufficient permissions"
+        )
+    return current_user
 
-def require_passenger(current_user: Dict[str, Any] = Depends(get_current_user)) -> Dict[str, Any]:
+async def require_passenger(current_user: Dict[str, Any] = Depends(get_current_user)) -> Dict[str, Any]:
     """Dependency to require passenger role"""
-    return security_manager.require_role("passenger")(current_user)
\ No newline at end of file
+    if current_user.get("role", "passenger") not in PASSENGER_ROLES:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Insufficient permissions"
+        )
+    return current_user
\ No newline at end of file
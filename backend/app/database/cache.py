@@ -0,0 +1,197 @@
+"""
+Redis read-through cache for near-static documents (routes, stops)
+"""
+
+from typing import Any, Awaitable, Callable, List, Optional
+import logging
+import time
+
+import redis.asyncio as redis
+from bson import json_util
+from cachetools import TTLCache
+
+from app.core.config import settings, CACHE_TTL_SECONDS
+from app.database.mongodb import get_routes_collection, get_stops_collection
+
+logger = logging.getLogger(__name__)
+
+# Naive UTC datetimes on load, matching what Motor returns on a cache miss
+CACHE_JSON_OPTIONS = json_util.JSONOptions(tz_aware=False)
+
+# After a Redis error, skip Redis for this long instead of retrying on every read
+REDIS_RETRY_BACKOFF_SECONDS = 5.0
+
+class RedisCache:
+    """Read-through cache backed by Redis; errors are treated as misses"""
+    
+    def __init__(self):
+        self.client: Optional[redis.Redis] = None
+        self._retry_at: float = 0.0
+    
+    def _available(self) -> bool:
+        """Whether Redis should be tried (client exists and not backing off)"""
+        return self.client is not None and time.monotonic() >= self._retry_at
+    
+    def _failed(self, operation: str, key: Any, error: Exception):
+        """Start a backoff window; logged once per window rather than per call"""
+        self._retry_at = time.monotonic() + REDIS_RETRY_BACKOFF_SECONDS
+        logger.warning(
+            f"Cache {operation} failed for {key}: {error}; "
+            f"bypassing Redis for {REDIS_RETRY_BACKOFF_SECONDS:.0f}s"
+        )
+    
+    async def connect(self):
+        """Create the Redis client"""
+        self.client = redis.from_url(settings.REDIS_URL)
+        logger.info("✅ Redis cache client created")
+    
+    async def disconnect(self):
+        """Close the Redis client"""
+        if self.client:
+            await self.client.close()
+            self.client = None
+            logger.info("✅ Redis cache client closed")
+    
+    async def get(self, key: str) -> Optional[Any]:
+        """Get a cached value, or None on miss/error"""
+        if not self._available():
+            return None
+        try:
+            raw = await self.client.get(key)
+        except Exception as e:
+            self._failed("get", key, e)
+            return None
+        return json_util.loads(raw, json_options=CACHE_JSON_OPTIONS) if raw is not None else None
+    
+    async def set(self, key: str, value: Any, ttl: Optional[int] = None):
+        """Store a value with a TTL"""
+        if not self._available():
+            return
+        try:
+            await self.client.set(
+                key,
+                json_util.dumps(value, json_options=CACHE_JSON_OPTIONS),
+                ex=ttl or CACHE_TTL_SECONDS
+            )
+        except Exception as e:
+            self._failed("set", key, e)
+    
+    async def delete(self, *keys: str):
+        """Remove cached keys"""
+        if not self._available() or not keys:
+            return
+        try:
+            await self.client.delete(*keys)
+        except Exception as e:
+            self._failed("delete", keys, e)
+    
+    async def get_version(self, key: str) -> int:
+        """Current value of a version counter (0 if unset or on error)"""
+        if not self._available():
+            return 0
+        try:
+            raw = await self.client.get(key)
+        except Exception as e:
+            self._failed("version get", key, e)
+            return 0
+        return int(raw) if raw is not None else 0
+    
+    async def bump_version(self, key: str):
+        """Increment a version counter, orphaning keys built from the old version"""
+        if not self._available():
+            return
+        try:
+            await self.client.incr(key)
+        except Exception as e:
+            self._failed("version bump", key, e)
+    
+    async def get_or_load(self, key: str, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """Return the cached value for key, loading and caching it on a miss"""
+        value = await self.get(key)
+        if value is not None:
+            return value
+        
+        value = await loader()
+        if value is not None:
+            await self.set(key, value)
+        return value
+
+# Global cache instance
+cache = RedisCache()
+
+# Cache keys
+def route_key(route_id: str) -> str:
+    """Cache key for a single route"""
+    return f"route:{route_id}"
+
+def stop_key(stop_id: str) -> str:
+    """Cache key for a single stop"""
+    return f"stop:{stop_id}"
+
+ROUTES_LIST_PREFIX = "routes:list:"
+STOPS_LIST_PREFIX = "stops:list:"
+
+# Listing keys embed a version counter; bumping it invalidates every listing
+# without scanning the keyspace (stale versions expire with their TTL)
+def list_version_key(prefix: str) -> str:
+    """Version counter key for a listing prefix"""
+    return f"{prefix}version"
+
+async def list_key(prefix: str, *parts: Any) -> str:
+    """Cache key for a listing under the prefix's current version"""
+    version = await cache.get_version(list_version_key(prefix))
+    return f"{prefix}v{version}:" + ":".join(str(part) for part in parts)
+
+# Process-local route stop lists for the per-trip realtime loop. Invalidated locally by
+# invalidate_route; the short TTL bounds staleness in other workers.
+ROUTE_STOPS_LOCAL_TTL_SECONDS = 30
+_route_stops_local: TTLCache = TTLCache(maxsize=4096, ttl=ROUTE_STOPS_LOCAL_TTL_SECONDS)
+
+async def init_cache():
+    """Initialize cache connection"""
+    await cache.connect()
+
+async def close_cache():
+    """Close cache connection"""
+    await cache.disconnect()
+
+async def get_route_cached(route_id: str) -> Optional[dict]:
+    """Get a route document through the cache"""
+    return await cache.get_or_load(
+        route_key(route_id),
+        lambda: get_routes_collection().find_one({"_id": route_id})
+    )
+
+async def get_route_stops_cached(route_id: str) -> Optional[List[str]]:
+    """Get a route's ordered stop ids from process memory, falling back to the shared route cache"""
+    stops = _route_stops_local.get(route_id)
+    if stops is None:
+        route = await get_route_cached(route_id)
+        stops = route.get("stops") if route else None
+        if stops:
+            _route_stops_local[route_id] = stops
+    return stops
+
+async def get_stop_cached(stop_id: str) -> Optional[dict]:
+    """Get a stop document through the cache"""
+    return await cache.get_or_load(
+        stop_key(stop_id),
+        lambda: get_stops_collection().find_one({"_id": stop_id})
+    )
+
+async def invalidate_route(route_id: Optional[str] = None):
+    """Drop a cached route and all cached route listings"""
+    if route_id:
+        # Deferred import: the prediction engine pulls in the ML stack
+        from app.ml.prediction_engine import ml_engine
+        
+        _route_stops_local.pop(route_id, None)
+        ml_engine.invalidate_route(route_id)
+        await cache.delete(route_key(route_id))
+    await cache.bump_version(list_version_key(ROUTES_LIST_PREFIX))
+
+async def invalidate_stop(stop_id: Optional[str] = None):
+    """Drop a cached stop and all cached stop listings"""
+    if stop_id:
+        await cache.delete(stop_key(stop_id))
+    await cache.bump_version(list_version_key(STOPS_LIST_PREFIX))
@@ -2,36 +2,80 @@
 MongoDB database connection and initialization
 """
 
-from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
-from pymongo import IndexModel, ASCENDING, DESCENDING, GEO2D
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase, AsyncIOMotorCollection
+from pymongo import IndexModel, UpdateOne, ASCENDING, DESCENDING, GEOSPHERE
+from pymongo.errors import DuplicateKeyError, OperationFailure
 from app.core.config import settings
 import logging
-from typing import Optional
+from typing import Any, Dict, Optional
 
 logger = logging.getLogger(__name__)
 
+# Index names
+NOTIFICATIONS_USER_CREATED_INDEX = "user_id_1_created_at_-1"
+NOTIFICATIONS_USER_READ_CREATED_INDEX = "user_id_1_is_read_1_created_at_-1"
+TRIPS_ROUTE_STATUS_START_INDEX = "trips_route_status_start"
+TRIPS_COMPLETED_INDEX = "trips_completed"
+NOTIFICATIONS_TRIP_DELAY_UNIQUE_INDEX = "notifications_trip_delay_unique"
+NOTIFICATIONS_READ_TTL_INDEX = "notifications_read_ttl"
+
+# Notifications older than this are removed (read ones by the TTL index)
+NOTIFICATION_RETENTION_SECONDS = 30 * 86400
+
+# Stops keep location as {latitude, longitude}; this GeoJSON copy backs the 2dsphere index
+STOP_GEO_FIELD = "geo_location"
+STOP_GEO_INDEX = "stops_geo_location"
+# Flat 2d index on the embedded location, superseded by the geo_location index
+LEGACY_STOP_LOCATION_INDEX = "location_2d"
+
+# Collections bound once at connect time
+COLLECTION_NAMES = (
+    "users", "routes", "stops", "trips", "schedules",
+    "subscriptions", "notifications", "trip_states"
+)
+
 class MongoDB:
     """MongoDB connection manager"""
     
     def __init__(self):
         self.client: Optional[AsyncIOMotorClient] = None
         self.database: Optional[AsyncIOMotorDatabase] = None
+        self.collections: Dict[str, AsyncIOMotorCollection] = {}
         self._connected = False
     
     async def connect(self):
         """Connect to MongoDB"""
         try:
-            self.client = AsyncIOMotorClient(settings.MONGODB_URL)
+            self.client = AsyncIOMotorClient(
+                settings.MONGODB_URL,
+                minPoolSize=settings.MONGODB_MIN_POOL_SIZE,
+                maxPoolSize=settings.MONGODB_MAX_POOL_SIZE,
+                maxIdleTimeMS=settings.MONGODB_MAX_IDLE_TIME_MS,
+                serverSelectionTimeoutMS=settings.MONGODB_SERVER_SELECTION_TIMEOUT_MS,
+                compressors=settings.MONGODB_COMPRESSORS
+            )
             self.database = self.client[settings.DATABASE_NAME]
+            self.collections = {
+                name: self.database[name] for name in COLLECTION_NAMES
+            }
             
-            # Test connection
+            # Test connection (also forces the initial handshake)
             await self.client.admin.command('ping')
             self._connected = True
             logger.info(f"✅ Connected to MongoDB: {settings.DATABASE_NAME}")
             
+            # Add GeoJSON points to stops written before geo_location existed
+            await self._migrate_stop_locations()
+            
             # Create indexes
             await self._create_indexes()
             
+            # Lowercase emails stored before registration/login normalized them
+            await self._normalize_user_emails()
+            
+            # Seed unread counters before any writer adjusts them
+            await self._backfill_unread_counts()
+        
         except Exception as e:
             logger.error(f"❌ Failed to connect to MongoDB: {e}")
             self._connected = False
@@ -49,6 +93,26 @@ class MongoDB:
         """Check if connected to MongoDB"""
         return self._connected
     
+    async def _migrate_stop_locations(self):
+        """Drop the 2d index on the embedded location and backfill geo_location points"""
+        if LEGACY_STOP_LOCATION_INDEX in await self.database.stops.index_information():
+            await self.database.stops.drop_index(LEGACY_STOP_LOCATION_INDEX)
+            logger.info(f"✅ Dropped legacy stops index {LEGACY_STOP_LOCATION_INDEX}")
+        
+        result = await self.database.stops.update_many(
+            {
+                STOP_GEO_FIELD: {"$exists": False},
+                "location.latitude": {"$type": "number"},
+                "location.longitude": {"$type": "number"}
+            },
+            [{"$set": {STOP_GEO_FIELD: {
+                "type": "Point",
+                "coordinates": ["$location.longitude", "$location.latitude"]
+            }}}]
+        )
+        if result.modified_count:
+            logger.info(f"✅ Added {STOP_GEO_FIELD} to {result.modified_count} stops")
+    
     async def _create_indexes(self):
         """Create database indexes for optimal performance"""
         try:
@@ -70,7 +134,7 @@ class MongoDB:
             # Stops collection indexes
             await self.database.stops.create_indexes([
                 IndexModel([("code", ASCENDING)], unique=True),
-                IndexModel([("location", GEO2D)]),
+                IndexModel([(STOP_GEO_FIELD, GEOSPHERE)], name=STOP_GEO_INDEX),
                 IndexModel([("is_active", ASCENDING)]),
                 IndexModel([("name", ASCENDING)])
             ])
@@ -82,7 +146,18 @@ class MongoDB:
                 IndexModel([("trip_start_time", DESCENDING)]),
                 IndexModel([("next_stop_id", ASCENDING)]),
                 IndexModel([("route_id", ASCENDING), ("trip_start_time", DESCENDING)]),
-                IndexModel([("current_position.last_updated", DESCENDING)])
+                IndexModel([("current_position.last_updated", DESCENDING)]),
+                IndexModel([("status", ASCENDING), ("trip_start_time", DESCENDING)]),
+                # Route + status equality, start time sort/range (upcoming trips per route)
+                IndexModel(
+                    [("route_id", ASCENDING), ("status", ASCENDING), ("trip_start_time", ASCENDING)],
+                    name=TRIPS_ROUTE_STATUS_START_INDEX
+                ),
+                IndexModel(
+                    [("route_id", ASCENDING), ("trip_start_time", ASCENDING)],
+                    name=TRIPS_COMPLETED_INDEX,
+                    partialFilterExpression={"status": "completed"}
+                )
             ])
             
             # Schedules collection indexes
@@ -98,6 +173,7 @@ class MongoDB:
                 IndexModel([("user_id", ASCENDING)]),
                 IndexModel([("route_id", ASCENDING)]),
                 IndexModel([("is_active", ASCENDING)]),
+                IndexModel([("route_id", ASCENDING), ("is_active", ASCENDING)]),
                 IndexModel([("user_id", ASCENDING), ("route_id", ASCENDING)], unique=True)
             ])
             
@@ -109,9 +185,41 @@ class MongoDB:
                 IndexModel([("created_at", DESCENDING)]),
                 IndexModel([("trip_id", ASCENDING)]),
                 IndexModel([("route_id", ASCENDING)]),
-                IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING)])
+                IndexModel(
+                    [("user_id", ASCENDING), ("created_at", DESCENDING)],
+                    name=NOTIFICATIONS_USER_CREATED_INDEX
+                ),
+                IndexModel(
+                    [("user_id", ASCENDING), ("is_read", ASCENDING), ("created_at", DESCENDING)],
+                    name=NOTIFICATIONS_USER_READ_CREATED_INDEX
+                ),
+                # Read notifications expire in the background; unread ones are
+                # swept by the realtime service, which also fixes unread counters
+                IndexModel(
+                    [("created_at", ASCENDING)],
+                    name=NOTIFICATIONS_READ_TTL_INDEX,
+                    expireAfterSeconds=NOTIFICATION_RETENTION_SECONDS,
+                    partialFilterExpression={"is_read": True}
+                )
             ])
             
+            # At most one delay notification per user and trip. Existing duplicates
+            # make the build fail; keep serving and report them instead.
+            try:
+                await self.database.notifications.create_indexes([
+                    IndexModel(
+                        [("user_id", ASCENDING), ("trip_id", ASCENDING), ("type", ASCENDING)],
+                        name=NOTIFICATIONS_TRIP_DELAY_UNIQUE_INDEX,
+                        unique=True,
+                        partialFilterExpression={"type": "delay", "trip_id": {"$type": "string"}}
+                    )
+                ])
+            except OperationFailure as e:
+                logger.error(
+                    f"❌ Could not create {NOTIFICATIONS_TRIP_DELAY_UNIQUE_INDEX}, duplicate delay "
+                    f"notifications must be removed before it can be built: {e}"
+                )
+            
             # Trip states collection (for simulation)
             await self.database.trip_states.create_indexes([
                 IndexModel([("trip_id", ASCENDING)]),
@@ -125,12 +233,67 @@ class MongoDB:
             logger.error(f"❌ Failed to create indexes: {e}")
             raise
 
+    async def _normalize_user_emails(self):
+        """Lowercase stored emails; collisions with an existing address are reported, not merged"""
+        collisions = []
+        normalized = 0
+        
+        async for user in self.database.users.find(
+            {"$expr": {"$ne": ["$email", {"$toLower": "$email"}]}},
+            {"email": 1}
+        ):
+            try:
+                await self.database.users.update_one(
+                    {"_id": user["_id"]},
+                    {"$set": {"email": user["email"].lower()}}
+                )
+                normalized += 1
+            except DuplicateKeyError:
+                collisions.append(user)
+        
+        if normalized:
+            logger.info(f"✅ Lowercased {normalized} user emails")
+        for user in collisions:
+            logger.error(
+                f"❌ User {user['_id']} email {user['email']!r} collides with an existing "
+                f"lowercase account and was left unchanged; merge these accounts manually"
+            )
+    
+    async def _backfill_unread_counts(self):
+        """Initialise users.unread_notif_count for users that don't have it yet"""
+        user_ids = await self.database.users.distinct(
+            "_id", {"unread_notif_count": {"$exists": False}}
+        )
+        if not user_ids:
+            return
+        
+        unread_counts = await self.database.notifications.aggregate([
+            {"$match": {"user_id": {"$in": user_ids}, "is_read": False}},
+            {"$group": {"_id": "$user_id", "count": {"$sum": 1}}}
+        ]).to_list(length=None)
+        counts = {entry["_id"]: entry["count"] for entry in unread_counts}
+        
+        # Conditional on the field still missing so a concurrent seed isn't overwritten
+        await self.database.users.bulk_write([
+            UpdateOne(
+                {"_id": user_id, "unread_notif_count": {"$exists": False}},
+                {"$set": {"unread_notif_count": counts.get(user_id, 0)}}
+            )
+            for user_id in user_ids
+        ], ordered=False)
+        
+        logger.info(f"✅ Initialised unread notification counters for {len(user_ids)} users")
+
 # Global MongoDB instance
 mongodb = MongoDB()
 
 # Alias for compatibility
 database_manager = mongodb
 
+def stop_geo_point(location: Dict[str, float]) -> Dict[str, Any]:
+    """GeoJSON point ([longitude, latitude] order) for a stop's location"""
+    return {"type": "Point", "coordinates": [location["longitude"], location["latitude"]]}
+
 # Database connection functions
 async def init_database():
     """Initialize database connection"""
@@ -147,32 +310,32 @@ def get_database() -> AsyncIOMotorDatabase:
 # Collection getters
 def get_users_collection():
     """Get users collection"""
-    return mongodb.database.users
+    return mongodb.collections["users"]
 
 def get_routes_collection():
     """Get routes collection"""
-    return mongodb.database.routes
+    return mongodb.collections["routes"]
 
 def get_stops_collection():
     """Get stops collection"""
-    return mongodb.database.stops
+    return mongodb.collections["stops"]
 
 def get_trips_collection():
     """Get trips collection"""
-    return mongodb.database.trips
+    return mongodb.collections["trips"]
 
 def get_schedules_collection():
     """Get schedules collection"""
-    return mongodb.database.schedules
+    return mongodb.collections["schedules"]
 
 def get_subscriptions_collection():
     """Get subscriptions collection"""
-    return mongodb.database.subscriptions
+    return mongodb.collections["subscriptions"]
 
 def get_notifications_collection():
     """Get notifications collection"""
-    return mongodb.database.notifications
+    return mongodb.collections["notifications"]
 
 def get_trip_states_collection():
     """Get trip states collection"""
-    return mongodb.database.trip_states
\ No newline at end of file
+    return mongodb.collections["trip_states"]
\ No newline at end of file
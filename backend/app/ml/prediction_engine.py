@@ -14,19 +14,103 @@ from typing import Dict, List, Optional, Tuple, Any
 from pathlib import Path
 import pandas as pd
 import numpy as np
-from sklearn.ensemble import RandomForestRegressor, GradientBoostingRegressor
+from sklearn.ensemble import RandomForestRegressor, HistGradientBoostingRegressor
 from sklearn.linear_model import LinearRegression
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
 from sklearn.preprocessing import StandardScaler, LabelEncoder
+import os
 import joblib
+from cachetools import TTLCache
 
-from app.core.config import settings
+# Optional compiled inference via ONNX Runtime
+try:
+    from skl2onnx import convert_sklearn
+    from skl2onnx.common.data_types import FloatTensorType
+    import onnxruntime
+    ONNX_AVAILABLE = True
+except ImportError:
+    ONNX_AVAILABLE = False
+
+# Optional JIT compilation of the branchy feature kernels
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+from app.core.config import settings, ensure_directories, CACHE_TTL_SECONDS
 from app.database.mongodb import get_trips_collection, get_routes_collection
 from app.models.schemas import TripPrediction
 
 logger = logging.getLogger(__name__)
 
+# Route fields read by feature extraction
+ROUTE_FEATURE_PROJECTION = {"stops": 1, "distance_km": 1, "estimated_duration_minutes": 1}
+
+# Shared seeded random generator for the mock weather factors and synthetic data
+_rng = np.random.default_rng(42)
+
+def _fit_model(
+    model_name: str,
+    model: Any,
+    X_train: np.ndarray,
+    y_train: np.ndarray,
+    X_test: np.ndarray
+) -> Tuple[str, Any, Optional[np.ndarray], Optional[StandardScaler], Optional[str]]:
+    """Fit one model in a worker process; returns (name, model, y_pred, scaler, error)"""
+    try:
+        if model_name == 'linear_regression':
+            # Only the linear model needs scaled features
+            scaler = StandardScaler()
+            model.fit(scaler.fit_transform(X_train), y_train)
+            return model_name, model, model.predict(scaler.transform(X_test)), scaler, None
+        
+        model.fit(X_train, y_train)
+        return model_name, model, model.predict(X_test), None, None
+    except Exception as e:
+        return model_name, None, None, None, str(e)
+
+def _dump_atomic(obj: Any, path: Path):
+    """joblib.dump to a temp file renamed over path, so memory-mapped readers keep the old file"""
+    tmp_file = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    try:
+        joblib.dump(obj, tmp_file)
+        os.replace(tmp_file, path)
+    finally:
+        tmp_file.unlink(missing_ok=True)
+
+if NUMBA_AVAILABLE:
+    @njit(cache=True)
+    def _traffic_factors_jit(hours: np.ndarray, days_of_week: np.ndarray) -> np.ndarray:
+        """Single-pass compiled traffic factors (same branches as calculate_traffic_factor)"""
+        out = np.empty(hours.shape[0], dtype=np.float64)
+        for i in range(hours.shape[0]):
+            hour = hours[i]
+            if days_of_week[i] >= 5:
+                out[i] = 1.2 if 10 <= hour <= 16 else 0.9
+            elif 7 <= hour <= 9:
+                out[i] = 1.8
+            elif 17 <= hour <= 19:
+                out[i] = 1.9
+            elif 10 <= hour <= 16:
+                out[i] = 1.3
+            elif 19 <= hour <= 22:
+                out[i] = 1.2
+            else:
+                out[i] = 0.7
+        return out
+
+class OnnxModel:
+    """sklearn-style predict() backed by an ONNX Runtime session"""
+    
+    def __init__(self, path: Path):
+        self.session = onnxruntime.InferenceSession(str(path), providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+    
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        return self.session.run(None, {self.input_name: np.asarray(X, dtype=np.float32)})[0].ravel()
+
 class DelayPredictionEngine:
     """Machine Learning engine for predicting bus delays"""
     
@@ -35,8 +119,17 @@ class DelayPredictionEngine:
         self.scalers: Dict[str, StandardScaler] = {}
         self.encoders: Dict[str, LabelEncoder] = {}
         self.model_metadata: Dict[str, Dict] = {}
+        self.onnx_models: Dict[str, OnnxModel] = {}
         self.is_trained = False
         
+        # model_name -> (model, confidence, scaler or None), rebuilt after train/load
+        self._predict_ctx: Dict[str, Tuple[Any, float, Optional[StandardScaler]]] = {}
+        
+        # Route documents and per-slot predictions; features only vary by
+        # (route, hour, weekday, month), so a slot's prediction is reused until it expires
+        self._route_cache: TTLCache = TTLCache(maxsize=1024, ttl=CACHE_TTL_SECONDS)
+        self._slot_cache: TTLCache = TTLCache(maxsize=50_000, ttl=CACHE_TTL_SECONDS)
+        
         # Model types to train
         self.model_types = {
             'linear_regression': LinearRegression(),
@@ -44,10 +137,11 @@ class DelayPredictionEngine:
                 n_estimators=100,
                 max_depth=10,
                 random_state=42,
-                n_jobs=-1
+                # Leave cores for the other models training alongside it
+                n_jobs=max(1, (os.cpu_count() or 1) // 3)
             ),
-            'gradient_boosting': GradientBoostingRegressor(
-                n_estimators=100,
+            'gradient_boosting': HistGradientBoostingRegressor(
+                max_iter=100,
                 max_depth=6,
                 learning_rate=0.1,
                 random_state=42
@@ -69,7 +163,6 @@ class DelayPredictionEngine:
         ]
         
         self.models_dir = settings.MODELS_DIR
-        self.models_dir.mkdir(exist_ok=True)
     
     def extract_time_features(self, timestamp: datetime) -> Dict[str, float]:
         """Extract time-based features from timestamp"""
@@ -97,8 +190,7 @@ class DelayPredictionEngine:
             base_factor = 1.0
         
         # Add random weather variations
-        import random
-        weather_variation = random.uniform(0.8, 1.4)
+        weather_variation = _rng.uniform(0.8, 1.4)
         
         return base_factor * weather_variation
     
@@ -126,6 +218,40 @@ class DelayPredictionEngine:
         else:  # Night/early morning
             return 0.7
     
+    def weather_factors(self, months: np.ndarray) -> np.ndarray:
+        """Vectorized calculate_weather_factor over an array of months"""
+        base_factor = np.select(
+            [np.isin(months, (12, 1, 2)), np.isin(months, (6, 7, 8))],
+            [1.3, 1.1],
+            default=1.0
+        )
+        return base_factor * _rng.uniform(0.8, 1.4, np.shape(months))
+    
+    def traffic_factors(self, hours: np.ndarray, days_of_week: np.ndarray) -> np.ndarray:
+        """Vectorized calculate_traffic_factor over arrays of hours and weekdays"""
+        if NUMBA_AVAILABLE:
+            return _traffic_factors_jit(
+                np.ascontiguousarray(hours, dtype=np.float64),
+                np.ascontiguousarray(days_of_week, dtype=np.float64)
+            )
+        
+        weekend = days_of_week >= 5
+        midday = (hours >= 10) & (hours <= 16)
+        
+        # Conditions are checked in order, as in the scalar version
+        return np.select(
+            [
+                weekend & midday,
+                weekend,
+                (hours >= 7) & (hours <= 9),
+                (hours >= 17) & (hours <= 19),
+                midday,
+                (hours >= 19) & (hours <= 22)
+            ],
+            [1.2, 0.9, 1.8, 1.9, 1.3, 1.2],
+            default=0.7
+        )
+    
     def calculate_route_complexity_score(self, route_data: Dict) -> float:
         """Calculate route complexity based on stops, distance, and patterns"""
         stops_count = len(route_data.get('stops', []))
@@ -148,94 +274,109 @@ class DelayPredictionEngine:
         
         # Get routes
         routes_collection = get_routes_collection()
-        routes = await routes_collection.find({"is_active": True}).to_list(length=None)
+        routes = await routes_collection.find(
+            {"is_active": True}, ROUTE_FEATURE_PROJECTION
+        ).to_list(length=None)
         
         if not routes:
             logger.warning("No routes found for training data generation")
             return pd.DataFrame()
         
-        historical_data = []
         start_date = datetime.now() - timedelta(days=days_back)
-        
-        for route in routes:
-            route_id = route['_id']
-            
-            # Generate trips for each day
-            for day in range(days_back):
-                current_date = start_date + timedelta(days=day)
-                
-                # Generate multiple trips per day (every 30-60 minutes during service hours)
-                service_hours = range(6, 23)  # 6 AM to 11 PM
-                
-                for hour in service_hours:
-                    # Skip some hours randomly to simulate realistic schedules
-                    if np.random.random() < 0.3:
-                        continue
-                    
-                    trip_time = current_date.replace(
-                        hour=hour,
-                        minute=np.random.randint(0, 60),
-                        second=0,
-                        microsecond=0
-                    )
-                    
-                    # Extract features
-                    time_features = self.extract_time_features(trip_time)
-                    weather_factor = self.calculate_weather_factor(trip_time)
-                    traffic_factor = self.calculate_traffic_factor(trip_time)
-                    route_complexity = self.calculate_route_complexity_score(route)
-                    
-                    # Historical average delay (mock)
-                    base_delay = np.random.normal(2.0, 1.5)  # Average 2 minutes with variation
-                    
-                    # Calculate actual delay based on factors
-                    delay_multiplier = (
-                        weather_factor * 0.3 +
-                        traffic_factor * 0.4 +
-                        route_complexity * 0.2 +
-                        (1.0 if time_features['is_rush_hour'] else 0.8) * 0.1
-                    )
-                    
-                    actual_delay = max(0, base_delay * delay_multiplier + np.random.normal(0, 0.5))
-                    
-                    historical_data.append({
-                        'trip_id': f"trip_{route_id}_{trip_time.isoformat()}",
-                        'route_id': route_id,
-                        'timestamp': trip_time,
-                        'hour_of_day': time_features['hour_of_day'],
-                        'day_of_week': time_features['day_of_week'],
-                        'month': time_features['month'],
-                        'is_weekend': time_features['is_weekend'],
-                        'is_rush_hour': time_features['is_rush_hour'],
-                        'route_distance_km': route.get('distance_km', 10.0),
-                        'estimated_duration_minutes': route.get('estimated_duration_minutes', 30),
-                        'stops_count': len(route.get('stops', [])),
-                        'weather_factor': weather_factor,
-                        'traffic_factor': traffic_factor,
-                        'historical_avg_delay': base_delay,
-                        'route_complexity_score': route_complexity,
-                        'actual_delay_minutes': actual_delay
-                    })
-        
-        df = pd.DataFrame(historical_data)
+        service_hours = np.arange(6, 23, dtype=np.int8)  # 6 AM to 11 PM
+        slots_per_route = days_back * len(service_hours)
+        
+        # One row per (route, day, service hour) slot
+        route_idx = np.repeat(np.arange(len(routes)), slots_per_route)
+        day = np.tile(np.repeat(np.arange(days_back), len(service_hours)), len(routes))
+        hour = np.tile(service_hours, len(routes) * days_back)
+        
+        # Skip some hours randomly to simulate realistic schedules
+        keep = _rng.random(route_idx.size) >= 0.3
+        route_idx, day, hour = route_idx[keep], day[keep], hour[keep]
+        size = route_idx.size
+        minute = _rng.integers(0, 60, size)
+        
+        # Calendar fields per day, looked up by index
+        dates = [start_date + timedelta(days=d) for d in range(days_back)]
+        day_dates = np.array([d.date() for d in dates], dtype='datetime64[D]')
+        day_weekday = np.array([d.weekday() for d in dates], dtype=np.int8)
+        day_month = np.array([d.month for d in dates], dtype=np.int8)
+        
+        timestamps = (
+            day_dates[day].astype('datetime64[m]')
+            + hour.astype('timedelta64[h]')
+            + minute.astype('timedelta64[m]')
+        ).astype('datetime64[ns]')
+        day_of_week = day_weekday[day]
+        month = day_month[day]
+        
+        # Route-level features, looked up by index
+        route_ids = np.array([str(route['_id']) for route in routes], dtype=object)
+        route_distance = np.array([route.get('distance_km', 10.0) for route in routes], dtype=np.float64)
+        route_duration = np.array([route.get('estimated_duration_minutes', 30) for route in routes])
+        route_stops = np.array([len(route.get('stops', [])) for route in routes])
+        route_complexity = np.array([self.calculate_route_complexity_score(route) for route in routes])
+        
+        # Time, weather and traffic factors (int8 calendar fields, bool flags)
+        is_weekend = day_of_week >= 5
+        is_rush_hour = ((hour >= 7) & (hour <= 9)) | ((hour >= 17) & (hour <= 19))
+        weather_factor = self.weather_factors(month)
+        traffic_factor = self.traffic_factors(hour, day_of_week)
+        complexity = route_complexity[route_idx]
+        
+        # Historical average delay (mock): average 2 minutes with variation
+        base_delay = _rng.normal(2.0, 1.5, size)
+        
+        # Calculate actual delay based on factors
+        delay_multiplier = (
+            weather_factor * 0.3 +
+            traffic_factor * 0.4 +
+            complexity * 0.2 +
+            np.where(is_rush_hour, 1.0, 0.8) * 0.1
+        )
+        actual_delay = np.maximum(0, base_delay * delay_multiplier + _rng.normal(0, 0.5, size))
+        
+        # route_id as a categorical over the route index (int codes, one string per route);
+        # trip_id is dropped since it is just route_id + timestamp and unused in training
+        df = pd.DataFrame({
+            'route_id': pd.Categorical.from_codes(route_idx, categories=route_ids),
+            'timestamp': pd.DatetimeIndex(timestamps),
+            'hour_of_day': hour.astype(np.float64),
+            'day_of_week': day_of_week.astype(np.float64),
+            'month': month.astype(np.float64),
+            'is_weekend': is_weekend,
+            'is_rush_hour': is_rush_hour,
+            'route_distance_km': route_distance[route_idx],
+            'estimated_duration_minutes': route_duration[route_idx].astype(np.float64),
+            'stops_count': route_stops[route_idx].astype(np.float64),
+            'weather_factor': weather_factor,
+            'traffic_factor': traffic_factor,
+            'historical_avg_delay': base_delay,
+            'route_complexity_score': complexity,
+            'actual_delay_minutes': actual_delay
+        })
         logger.info(f"Generated {len(df)} historical data points")
         
-        # Save historical data for reference
-        data_file = self.models_dir / "historical_data.csv"
-        df.to_csv(data_file, index=False)
+        # Save historical data for reference (columnar, dtype-preserving)
+        ensure_directories()
+        data_file = self.models_dir / "historical_data.parquet"
+        df.to_parquet(data_file, compression="snappy", index=False)
         
         return df
     
     def prepare_features(self, df: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
         """Prepare features and target variables for training"""
-        # Ensure all feature columns exist
-        for col in self.feature_columns:
-            if col not in df.columns:
-                logger.warning(f"Feature column {col} not found, setting to 0")
-                df[col] = 0
-        
-        X = df[self.feature_columns].values
-        y = df['actual_delay_minutes'].values
+        # Ensure all feature columns exist (filled in one reindex, not per-column inserts)
+        missing = [col for col in self.feature_columns if col not in df.columns]
+        if missing:
+            logger.warning(f"Feature columns {missing} not found, setting to 0")
+        
+        # Row-major float32 matches sklearn's internal tree layout, avoiding a conversion copy
+        X = np.ascontiguousarray(
+            df.reindex(columns=self.feature_columns, fill_value=0).to_numpy(dtype=np.float32)
+        )
+        y = df['actual_delay_minutes'].to_numpy(dtype=np.float64)
         
         return X, y
     
@@ -254,82 +395,108 @@ class DelayPredictionEngine:
             logger.error("No training data available")
             return {}
         
+        # Fitting and saving are blocking; run them off the event loop. The thread only
+        # builds new dicts; serving keeps the current ones until they are swapped below.
+        trained = await asyncio.to_thread(self._fit_and_save, df)
+        if trained is None:
+            return {}
+        
+        models, scalers, model_metadata, onnx_models, model_performance = trained
+        
+        # Swap in the new model set in one step, on the loop
+        self.models, self.scalers, self.model_metadata, self.onnx_models = (
+            models, scalers, model_metadata, onnx_models
+        )
+        self.is_trained = True
+        self._refresh_predict_context()
+        logger.info("Model training completed successfully")
+        
+        return model_performance
+    
+    def _fit_and_save(
+        self,
+        df: pd.DataFrame
+    ) -> Optional[Tuple[Dict[str, Any], Dict[str, StandardScaler], Dict[str, Any], Dict[str, OnnxModel], Dict[str, float]]]:
+        """Fit and persist every model (blocking); returns (models, scalers, metadata, onnx_models, performance), or None unless all trained"""
         # Prepare features
         X, y = self.prepare_features(df)
         
         if len(X) == 0:
             logger.error("No features available for training")
-            return {}
+            return None
         
         # Split data
         X_train, X_test, y_train, y_test = train_test_split(
             X, y, test_size=0.2, random_state=42
         )
         
-        # Scale features
-        scaler = StandardScaler()
-        X_train_scaled = scaler.fit_transform(X_train)
-        X_test_scaled = scaler.transform(X_test)
-        
-        self.scalers['main'] = scaler
-        
-        # Train models
-        model_performance = {}
+        # Train models concurrently, one worker process per model
+        models: Dict[str, Any] = {}
+        scalers: Dict[str, StandardScaler] = {}
+        model_metadata: Dict[str, Any] = {}
+        onnx_models: Dict[str, OnnxModel] = {}
+        model_performance: Dict[str, float] = {}
+        
+        logger.info(f"Training {', '.join(self.model_types)}...")
+        fit_results = joblib.Parallel(n_jobs=len(self.model_types), backend='loky')(
+            joblib.delayed(_fit_model)(model_name, model, X_train, y_train, X_test)
+            for model_name, model in self.model_types.items()
+        )
         
-        for model_name, model in self.model_types.items():
-            logger.info(f"Training {model_name}...")
+        for model_name, model, y_pred, scaler, error in fit_results:
+            if error is not None:
+                logger.error(f"Failed to train {model_name}: {error}; keeping the current models")
+                return None
             
-            try:
-                # Train model
-                if model_name == 'linear_regression':
-                    model.fit(X_train_scaled, y_train)
-                    y_pred = model.predict(X_test_scaled)
-                else:
-                    model.fit(X_train, y_train)
-                    y_pred = model.predict(X_test)
-                
-                # Calculate metrics
-                mae = mean_absolute_error(y_test, y_pred)
-                mse = mean_squared_error(y_test, y_pred)
-                rmse = np.sqrt(mse)
-                r2 = r2_score(y_test, y_pred)
-                
-                # Store model and metadata
-                self.models[model_name] = model
-                self.model_metadata[model_name] = {
-                    'mae': mae,
-                    'mse': mse,
-                    'rmse': rmse,
-                    'r2_score': r2,
-                    'training_samples': len(X_train),
-                    'test_samples': len(X_test),
-                    'trained_at': datetime.utcnow().isoformat()
-                }
-                
-                model_performance[model_name] = mae
-                
-                logger.info(f"{model_name} - MAE: {mae:.2f}, RMSE: {rmse:.2f}, R²: {r2:.3f}")
-                
-                # Save model
-                model_file = self.models_dir / f"{model_name}_model.joblib"
-                joblib.dump(model, model_file)
-                
-            except Exception as e:
-                logger.error(f"Failed to train {model_name}: {e}")
-                continue
-        
-        # Save scaler and metadata
-        scaler_file = self.models_dir / "feature_scaler.joblib"
-        joblib.dump(scaler, scaler_file)
+            if scaler is not None:
+                scalers['main'] = scaler
+            
+            # Calculate metrics
+            mae = mean_absolute_error(y_test, y_pred)
+            mse = mean_squared_error(y_test, y_pred)
+            rmse = np.sqrt(mse)
+            r2 = r2_score(y_test, y_pred)
+            
+            # Store model and metadata
+            models[model_name] = model
+            model_metadata[model_name] = {
+                'mae': mae,
+                'mse': mse,
+                'rmse': rmse,
+                'r2_score': r2,
+                'training_samples': len(X_train),
+                'test_samples': len(X_test),
+                'trained_at': datetime.utcnow().isoformat()
+            }
+            
+            model_performance[model_name] = mae
+            
+            logger.info(f"{model_name} - MAE: {mae:.2f}, RMSE: {rmse:.2f}, R²: {r2:.3f}")
         
-        metadata_file = self.models_dir / "model_metadata.json"
-        with open(metadata_file, 'w') as f:
-            json.dump(self.model_metadata, f, indent=2)
+        ensure_directories()
         
-        self.is_trained = True
-        logger.info("Model training completed successfully")
+        try:
+            # Save models
+            for model_name, model in models.items():
+                model_file = self.models_dir / f"{model_name}_model.joblib"
+                _dump_atomic(model, model_file)
+                onnx_model = self._export_onnx(model_name, model)
+                if onnx_model is not None:
+                    onnx_models[model_name] = onnx_model
+            
+            # Save scaler (if the linear model fit one) and metadata
+            if 'main' in scalers:
+                scaler_file = self.models_dir / "feature_scaler.joblib"
+                _dump_atomic(scalers['main'], scaler_file)
+            
+            metadata_file = self.models_dir / "model_metadata.json"
+            with open(metadata_file, 'w') as f:
+                json.dump(model_metadata, f, indent=2)
+        except Exception as e:
+            logger.error(f"Failed to save trained models: {e}; keeping the current models")
+            return None
         
-        return model_performance
+        return models, scalers, model_metadata, onnx_models, model_performance
     
     def load_models(self) -> bool:
         """Load trained models from disk"""
@@ -345,15 +512,19 @@ class DelayPredictionEngine:
             if scaler_file.exists():
                 self.scalers['main'] = joblib.load(scaler_file)
             
-            # Load models
+            # Load models (numpy arrays memory-mapped read-only, shared via the page cache)
             for model_name in self.model_types.keys():
                 model_file = self.models_dir / f"{model_name}_model.joblib"
                 if model_file.exists():
-                    self.models[model_name] = joblib.load(model_file)
+                    self.models[model_name] = joblib.load(model_file, mmap_mode='r')
                     logger.info(f"Loaded {model_name} model")
+                    onnx_model = self._load_onnx(model_name)
+                    if onnx_model is not None:
+                        self.onnx_models[model_name] = onnx_model
             
             if self.models:
                 self.is_trained = True
+                self._refresh_predict_context()
                 logger.info("All models loaded successfully")
                 return True
             
@@ -362,13 +533,105 @@ class DelayPredictionEngine:
         
         return False
     
+    def _export_onnx(self, model_name: str, model: Any) -> Optional[OnnxModel]:
+        """Export a trained model to ONNX for compiled inference (optional); returns its session"""
+        onnx_file = self.models_dir / f"{model_name}_model.onnx"
+        onnx_file.unlink(missing_ok=True)  # never leave a stale export behind
+        
+        if not ONNX_AVAILABLE:
+            return None
+        
+        try:
+            onnx_model = convert_sklearn(
+                model,
+                initial_types=[("input", FloatTensorType([None, len(self.feature_columns)]))]
+            )
+            onnx_file.write_bytes(onnx_model.SerializeToString())
+            return self._load_onnx(model_name)
+        except Exception as e:
+            logger.warning(f"ONNX export failed for {model_name}, using sklearn predict: {e}")
+            return None
+    
+    def _load_onnx(self, model_name: str) -> Optional[OnnxModel]:
+        """Load an ONNX Runtime session for a model if an export exists"""
+        onnx_file = self.models_dir / f"{model_name}_model.onnx"
+        if not ONNX_AVAILABLE or not onnx_file.exists():
+            return None
+        
+        try:
+            onnx_model = OnnxModel(onnx_file)
+            logger.info(f"Loaded {model_name} ONNX runtime session")
+            return onnx_model
+        except Exception as e:
+            logger.warning(f"Failed to load ONNX model for {model_name}: {e}")
+            return None
+    
+    def invalidate_route(self, route_id: str):
+        """Drop a route's cached features and slot predictions after a route edit"""
+        self._route_cache.pop(route_id, None)
+        for key in [key for key in self._slot_cache if key[1] == route_id]:
+            self._slot_cache.pop(key, None)
+    
+    def _refresh_predict_context(self):
+        """Precompute per-model prediction inputs (model, confidence, scaler)"""
+        scaler = self.scalers.get('main')
+        self._predict_ctx = {}
+        self._slot_cache.clear()
+        for model_name, model in self.models.items():
+            mae = self.model_metadata.get(model_name, {}).get('mae', 2.0)
+            
+            # Confidence decreases with higher MAE
+            confidence = max(0.1, min(0.95, 1.0 - (mae / 10.0)))
+            self._predict_ctx[model_name] = (
+                self.onnx_models.get(model_name, model),
+                confidence,
+                scaler if model_name == 'linear_regression' else None
+            )
+    
     async def predict_delay(
         self,
         route_id: str,
         trip_start_time: datetime,
-        model_name: str = 'random_forest'
+        model_name: str = 'random_forest',
+        route: Optional[Dict[str, Any]] = None,
+        include_factors: bool = False
     ) -> Optional[TripPrediction]:
-        """Predict delay for a specific trip"""
+        """Predict delay for a specific trip (pass route to skip the lookup)"""
+        predictions = await self.predict_delay_batch(
+            route_id,
+            [trip_start_time],
+            model_name=model_name,
+            route=route,
+            include_factors=include_factors
+        )
+        return predictions[0]
+    
+    async def predict_delay_batch(
+        self,
+        route_id: str,
+        trip_start_times: List[datetime],
+        model_name: str = 'random_forest',
+        route: Optional[Dict[str, Any]] = None,
+        include_factors: bool = False
+    ) -> List[Optional[TripPrediction]]:
+        """Predict delays for several trips on one route with a single model call; results align with trip_start_times"""
+        return await self.predict_delays(
+            [(route_id, trip_start_time) for trip_start_time in trip_start_times],
+            model_name=model_name,
+            routes={route_id: route} if route else None,
+            include_factors=include_factors
+        )
+    
+    async def predict_delays(
+        self,
+        trips: List[Tuple[str, datetime]],
+        model_name: str = 'random_forest',
+        routes: Optional[Dict[str, Dict[str, Any]]] = None,
+        include_factors: bool = False
+    ) -> List[Optional[TripPrediction]]:
+        """Predict delays for (route_id, start time) pairs across routes; results align with trips (factors only if requested)"""
+        if not trips:
+            return []
         
         if not self.is_trained:
             # Try to load models
@@ -376,91 +639,131 @@ class DelayPredictionEngine:
                 # Train models if not available
                 await self.train_models()
         
-        if model_name not in self.models:
+        if model_name not in self._predict_ctx:
             logger.warning(f"Model {model_name} not available, using random_forest")
             model_name = 'random_forest'
             
-            if model_name not in self.models:
+            if model_name not in self._predict_ctx:
                 logger.error("No trained models available")
-                return None
+                return [None] * len(trips)
+        
+        model, confidence, scaler = self._predict_ctx[model_name]
         
         try:
-            # Get route information
-            routes_collection = get_routes_collection()
-            route = await routes_collection.find_one({"_id": route_id})
+            # Fetch every route not supplied by the caller or cached in one query
+            routes = dict(routes or {})
+            for route_id in {route_id for route_id, _ in trips} - routes.keys():
+                if route_id in self._route_cache:
+                    routes[route_id] = self._route_cache[route_id]
+            missing_ids = {route_id for route_id, _ in trips} - routes.keys()
+            if missing_ids:
+                routes_collection = get_routes_collection()
+                async for route in routes_collection.find(
+                    {"_id": {"$in": list(missing_ids)}}, ROUTE_FEATURE_PROJECTION
+                ):
+                    routes[route["_id"]] = route
+                    self._route_cache[route["_id"]] = route
             
-            if not route:
+            for route_id in missing_ids - routes.keys():
                 logger.error(f"Route {route_id} not found")
-                return None
             
-            # Extract features
-            time_features = self.extract_time_features(trip_start_time)
-            weather_factor = self.calculate_weather_factor(trip_start_time)
-            traffic_factor = self.calculate_traffic_factor(trip_start_time)
-            route_complexity = self.calculate_route_complexity_score(route)
+            # Route-level features, computed once per route:
+            # (distance_km, base_duration, stops_count, complexity, next_stop_id)
+            route_features = {
+                route_id: (
+                    route.get('distance_km', 10.0),
+                    route.get('estimated_duration_minutes', 30),
+                    len(route.get('stops', [])),
+                    self.calculate_route_complexity_score(route),
+                    route['stops'][0] if route.get('stops') else ''
+                )
+                for route_id, route in routes.items()
+            }
+            
+            known = [i for i, (route_id, _) in enumerate(trips) if route_id in route_features]
+            results: List[Optional[TripPrediction]] = [None] * len(trips)
+            if not known:
+                return results
             
             # Historical average (mock - in production, calculate from actual data)
             historical_avg_delay = 2.0
             
-            # Prepare feature vector
-            features = [
-                time_features['hour_of_day'],
-                time_features['day_of_week'],
-                time_features['month'],
-                route.get('distance_km', 10.0),
-                route.get('estimated_duration_minutes', 30),
-                len(route.get('stops', [])),
-                weather_factor,
-                traffic_factor,
-                historical_avg_delay,
-                route_complexity
+            # Per-trip (hour, weekday, month); reuse cached predictions for already-seen slots
+            trip_slots = [
+                (trips[i][1].hour, trips[i][1].weekday(), trips[i][1].month) for i in known
             ]
+            trip_route_features = [route_features[trips[i][0]] for i in known]
+            slot_keys = [
+                (model_name, trips[i][0], *slot) for i, slot in zip(known, trip_slots)
+            ]
+            slot_values = [self._slot_cache.get(key) for key in slot_keys]
+            misses = [j for j, value in enumerate(slot_values) if value is None]
             
-            feature_array = np.array(features).reshape(1, -1)
-            
-            # Scale features if using linear regression
-            if model_name == 'linear_regression' and 'main' in self.scalers:
-                feature_array = self.scalers['main'].transform(feature_array)
-            
-            # Make prediction
-            model = self.models[model_name]
-            predicted_delay = model.predict(feature_array)[0]
-            
-            # Calculate confidence based on model performance
-            model_meta = self.model_metadata.get(model_name, {})
-            mae = model_meta.get('mae', 2.0)
-            
-            # Confidence decreases with higher MAE
-            confidence = max(0.1, min(0.95, 1.0 - (mae / 10.0)))
-            
-            # Estimate arrival time
-            base_duration = route.get('estimated_duration_minutes', 30)
-            total_duration = base_duration + predicted_delay
-            estimated_arrival = trip_start_time + timedelta(minutes=total_duration)
+            if misses:
+                # Weather/traffic factors for the uncached slots in one pass
+                hours, days_of_week, months = np.array(
+                    [trip_slots[j] for j in misses], dtype=np.float64
+                ).T
+                weather_factors = self.weather_factors(months)
+                traffic_factors = self.traffic_factors(hours, days_of_week)
+                route_columns = np.array([trip_route_features[j][:4] for j in misses], dtype=np.float64)
+                
+                # Row-major float32 feature matrix in self.feature_columns order
+                feature_array = np.empty((len(misses), len(self.feature_columns)), dtype=np.float32, order='C')
+                feature_array[:, 0] = hours
+                feature_array[:, 1] = days_of_week
+                feature_array[:, 2] = months
+                feature_array[:, 3:6] = route_columns[:, :3]
+                feature_array[:, 6] = weather_factors
+                feature_array[:, 7] = traffic_factors
+                feature_array[:, 8] = historical_avg_delay
+                feature_array[:, 9] = route_columns[:, 3]
+                
+                # Scale features if using linear regression
+                if scaler is not None:
+                    feature_array = scaler.transform(feature_array)
+                
+                # Make predictions in one vectorized call
+                predicted_delays = model.predict(feature_array)
+                
+                for j, value in zip(misses, zip(
+                    predicted_delays.tolist(), weather_factors.tolist(), traffic_factors.tolist()
+                )):
+                    slot_values[j] = value
+                    self._slot_cache[slot_keys[j]] = value
             
-            # Create prediction object
-            prediction = TripPrediction(
-                trip_id=f"predicted_{route_id}_{trip_start_time.isoformat()}",
-                route_id=route_id,
-                predicted_delay_minutes=max(0, predicted_delay),
-                confidence=confidence,
-                next_stop_id=route['stops'][0] if route.get('stops') else '',
-                estimated_arrival=estimated_arrival,
-                factors={
-                    'weather_factor': weather_factor,
-                    'traffic_factor': traffic_factor,
-                    'route_complexity': route_complexity,
-                    'time_features': time_features,
-                    'model_used': model_name,
-                    'historical_avg_delay': historical_avg_delay
-                }
-            )
+            for i, (predicted_delay, weather_factor, traffic_factor), features in zip(
+                known, slot_values, trip_route_features
+            ):
+                route_id, trip_start_time = trips[i]
+                _, base_duration, _, route_complexity, next_stop_id = features
+                
+                # Estimate arrival time
+                total_duration = base_duration + predicted_delay
+                estimated_arrival = trip_start_time + timedelta(minutes=total_duration)
+                
+                results[i] = TripPrediction(
+                    trip_id=f"predicted_{route_id}_{trip_start_time.isoformat()}",
+                    route_id=route_id,
+                    predicted_delay_minutes=max(0, predicted_delay),
+                    confidence=confidence,
+                    next_stop_id=next_stop_id,
+                    estimated_arrival=estimated_arrival,
+                    factors={
+                        'weather_factor': weather_factor,
+                        'traffic_factor': traffic_factor,
+                        'route_complexity': route_complexity,
+                        'time_features': self.extract_time_features(trip_start_time),
+                        'model_used': model_name,
+                        'historical_avg_delay': historical_avg_delay
+                    } if include_factors else None
+                )
             
-            return prediction
+            return results
             
         except Exception as e:
             logger.error(f"Failed to predict delay: {e}")
-            return None
+            return [None] * len(trips)
     
     async def get_model_performance(self) -> Dict[str, Any]:
         """Get performance metrics for all trained models"""
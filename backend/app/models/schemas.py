@@ -2,7 +2,7 @@
 Pydantic models for the bus notification system
 """
 
-from pydantic import BaseModel, Field, validator, EmailStr
+from pydantic import BaseModel, ConfigDict, Field, validator, field_validator, EmailStr
 from typing import List, Optional, Dict, Any, Union
 from datetime import datetime, time
 from enum import Enum
@@ -41,16 +41,37 @@ class TripStatus(str, Enum):
     CANCELLED = "cancelled"
     DELAYED = "delayed"
 
+def model_projection(model: type) -> Dict[str, int]:
+    """Build a MongoDB projection covering a model's stored fields"""
+    return {
+        (field.alias or name): 1
+        for name, field in model.model_fields.items()
+    }
+
+def new_document_id() -> str:
+    """Generate a document id (dashless UUID4 hex)"""
+    return uuid.uuid4().hex
+
 # Base Models
 class BaseDocument(BaseModel):
     """Base document model with common fields"""
-    id: Optional[str] = Field(default_factory=lambda: str(uuid.uuid4()), alias="_id")
+    id: Optional[str] = Field(default_factory=new_document_id, alias="_id")
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
     
-    class Config:
-        populate_by_name = True
-        arbitrary_types_allowed = True
+    model_config = ConfigDict(
+        populate_by_name=True,
+        arbitrary_types_allowed=True,
+        extra="ignore",
+        from_attributes=False,
+        validate_assignment=False
+    )
+    
+    @field_validator("id", mode="before")
+    @classmethod
+    def stringify_id(cls, value: Any) -> Optional[str]:
+        """Accept raw Mongo _id values (e.g. ObjectId) as strings"""
+        return str(value) if value is not None else value
 
 # Location Models
 class Coordinate(BaseModel):
@@ -67,8 +88,8 @@ class Stop(BaseDocument):
     amenities: List[str] = Field(default_factory=list)
     is_active: bool = True
     
-    class Config:
-        schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "name": "Central Station",
                 "code": "CS001",
@@ -81,6 +102,7 @@ class Stop(BaseDocument):
                 "is_active": True
             }
         }
+    )
 
 class Route(BaseDocument):
     """Bus route model"""
@@ -92,8 +114,8 @@ class Route(BaseDocument):
     distance_km: Optional[float] = None
     estimated_duration_minutes: Optional[int] = None
     
-    class Config:
-        schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "name": "Downtown Express",
                 "code": "DTE001",
@@ -104,6 +126,7 @@ class Route(BaseDocument):
                 "estimated_duration_minutes": 45
             }
         }
+    )
 
 # Schedule Models
 class ScheduleEntry(BaseModel):
@@ -121,8 +144,8 @@ class Schedule(BaseDocument):
     valid_from: datetime
     valid_until: Optional[datetime] = None
     
-    class Config:
-        schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "route_id": "route1_id",
                 "service_type": "weekday",
@@ -137,6 +160,7 @@ class Schedule(BaseDocument):
                 "valid_from": "2024-01-01T00:00:00"
             }
         }
+    )
 
 # Trip Models
 class TripPosition(BaseModel):
@@ -158,8 +182,8 @@ class Trip(BaseDocument):
     next_stop_id: Optional[str] = None
     completed_stops: List[str] = Field(default_factory=list)
     
-    class Config:
-        schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "route_id": "route1_id",
                 "schedule_id": "schedule1_id",
@@ -170,6 +194,7 @@ class Trip(BaseDocument):
                 "completed_stops": ["stop1_id"]
             }
         }
+    )
 
 # User Models
 class UserPreferences(BaseModel):
@@ -191,8 +216,8 @@ class User(BaseDocument):
     preferences: UserPreferences = Field(default_factory=UserPreferences)
     hashed_password: str
     
-    class Config:
-        schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "email": "user@example.com",
                 "phone": "+1234567890",
@@ -207,6 +232,7 @@ class User(BaseDocument):
                 }
             }
         }
+    )
 
 # Subscription Models
 class Subscription(BaseDocument):
@@ -216,8 +242,8 @@ class Subscription(BaseDocument):
     stop_ids: List[str] = Field(default_factory=list)  # Specific stops, empty = all stops
     is_active: bool = True
     
-    class Config:
-        schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "user_id": "user1_id",
                 "route_id": "route1_id",
@@ -225,6 +251,7 @@ class Subscription(BaseDocument):
                 "is_active": True
             }
         }
+    )
 
 # Notification Models
 class Notification(BaseDocument):
@@ -240,8 +267,8 @@ class Notification(BaseDocument):
     sent_at: Optional[datetime] = None
     delivery_status: Dict[str, str] = Field(default_factory=dict)  # email, sms, push status
     
-    class Config:
-        schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "user_id": "user1_id",
                 "type": "delay",
@@ -257,6 +284,7 @@ class Notification(BaseDocument):
                 }
             }
         }
+    )
 
 # Request/Response Models
 class UserCreate(BaseModel):
@@ -266,11 +294,23 @@ class UserCreate(BaseModel):
     name: str = Field(..., min_length=1, max_length=200)
     password: str = Field(..., min_length=8)
     preferences: Optional[UserPreferences] = None
+    
+    @field_validator("email")
+    @classmethod
+    def normalize_email(cls, value: str) -> str:
+        """Store emails lowercased so the unique index is case-insensitive"""
+        return value.strip().lower()
 
 class UserLogin(BaseModel):
     """User login request"""
     email: EmailStr
     password: str
+    
+    @field_validator("email")
+    @classmethod
+    def normalize_email(cls, value: str) -> str:
+        """Match the lowercased form stored at registration"""
+        return value.strip().lower()
 
 class UserResponse(BaseModel):
     """User response model"""
@@ -303,7 +343,7 @@ class TripPrediction(BaseModel):
     confidence: float = Field(..., ge=0, le=1)
     next_stop_id: str
     estimated_arrival: datetime
-    factors: Dict[str, Any] = Field(default_factory=dict)
+    factors: Optional[Dict[str, Any]] = None  # Only populated when explicitly requested
 
 class RouteStatus(BaseModel):
     """Real-time route status"""
@@ -4,13 +4,28 @@ This module handles OpenAI API calls server-side to avoid CORS issues
 """
 
 import os
-from openai import OpenAI
+import functools
+import hashlib
+import logging
+from cachetools import TTLCache
+from openai import AsyncOpenAI
 from fastapi import HTTPException
-from typing import Dict, Any
+from typing import Dict, Any, AsyncIterator, List, Optional
 import json
 
-# Initialize OpenAI client
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+logger = logging.getLogger(__name__)
+
+# API key is read once at import; without it every AI call short-circuits
+_AI_ENABLED = bool(os.getenv("OPENAI_API_KEY"))
+
+# Answers keyed by normalized question + route data; repeat questions skip the API call
+RESPONSE_CACHE_TTL_SECONDS = 600
+_response_cache: TTLCache = TTLCache(maxsize=1024, ttl=RESPONSE_CACHE_TTL_SECONDS)
+
+@functools.lru_cache(maxsize=None)
+def get_client() -> AsyncOpenAI:
+    """Shared async OpenAI client, created on first use (one connection pool for all calls)"""
+    return AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 
 # BusTracker business context
 BUSTRACKER_CONTEXT = """
@@ -52,42 +67,177 @@ Your role and task is:
 - Always be accurate about our capabilities (87% delay prediction, 247 buses, 12,847 users, 99.8% uptime)
 """
 
+def _response_cache_key(user_message: str, route_data: Dict[str, Any] = None) -> str:
+    """Cache key for a question (case/whitespace-insensitive) and its route data"""
+    normalized = " ".join(user_message.lower().split())
+    route_json = json.dumps(route_data, sort_keys=True, default=str) if route_data else ""
+    return hashlib.blake2b(f"{normalized}\0{route_json}".encode(), digest_size=16).hexdigest()
+
+# System message reused by every request without route data
+SYSTEM_MESSAGE = {"role": "system", "content": BUSTRACKER_CONTEXT}
+
+# Chat completion settings shared by interactive and batch requests
+CHAT_MODEL = "gpt-3.5-turbo"
+CHAT_MAX_TOKENS = 300
+CHAT_TEMPERATURE = 0.7
+
+def _chat_messages(user_message: str, route_data: Dict[str, Any] = None) -> List[Dict[str, str]]:
+    """Build the system + user messages, with compact route data (fewer input tokens)"""
+    system_message = SYSTEM_MESSAGE
+    if route_data:
+        route_json = json.dumps(route_data, separators=(",", ":"), default=str)
+        system_message = {
+            "role": "system",
+            "content": f"{BUSTRACKER_CONTEXT}\n\nCurrent route data: {route_json}"
+        }
+    return [system_message, {"role": "user", "content": user_message}]
+
 async def get_ai_response(user_message: str, route_data: Dict[str, Any] = None) -> str:
     """
     Get AI-powered response from OpenAI API
     """
     try:
-        if not os.getenv("OPENAI_API_KEY"):
+        if not _AI_ENABLED:
             return "AI service is not configured. Please set the OPENAI_API_KEY environment variable."
         
-        # Prepare the context with route data
-        context = BUSTRACKER_CONTEXT
-        if route_data:
-            context += f"\n\nCurrent route data: {json.dumps(route_data, indent=2)}"
+        # Serve repeat questions from cache
+        cache_key = _response_cache_key(user_message, route_data)
+        cached = _response_cache.get(cache_key)
+        if cached is not None:
+            return cached
         
         # Make OpenAI API call
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": context},
-                {"role": "user", "content": user_message}
-            ],
-            max_tokens=300,
-            temperature=0.7,
+        response = await get_client().chat.completions.create(
+            model=CHAT_MODEL,
+            messages=_chat_messages(user_message, route_data),
+            max_tokens=CHAT_MAX_TOKENS,
+            temperature=CHAT_TEMPERATURE,
         )
         
-        return response.choices[0].message.content
+        content = response.choices[0].message.content
+        if content:
+            _response_cache[cache_key] = content
+        return content
         
     except Exception as e:
-        print(f"OpenAI API Error: {str(e)}")
+        logger.error(f"OpenAI API Error: {e}")
+        return _error_message(e)
+
+async def stream_ai_response(user_message: str, route_data: Dict[str, Any] = None) -> AsyncIterator[str]:
+    """
+    Stream an AI response as text deltas (cached answers arrive as a single chunk)
+    """
+    if not _AI_ENABLED:
+        yield "AI service is not configured. Please set the OPENAI_API_KEY environment variable."
+        return
+    
+    cache_key = _response_cache_key(user_message, route_data)
+    cached = _response_cache.get(cache_key)
+    if cached is not None:
+        yield cached
+        return
+    
+    parts: List[str] = []
+    try:
+        stream = await get_client().chat.completions.create(
+            model=CHAT_MODEL,
+            messages=_chat_messages(user_message, route_data),
+            max_tokens=CHAT_MAX_TOKENS,
+            temperature=CHAT_TEMPERATURE,
+            stream=True,
+        )
         
-        # Specific error handling
-        error_str = str(e).lower()
-        if "api key" in error_str:
-            return "AI service authentication failed. Please contact support."
-        elif "quota" in error_str or "billing" in error_str:
-            return "AI service is temporarily unavailable due to usage limits. Please try again later."
-        elif "rate limit" in error_str:
-            return "AI service is busy. Please wait a moment and try again."
-        else:
-            return "I'm experiencing technical difficulties. Please try again or ask me about our bus routes, schedules, delay predictions, or any other BusTracker features."
\ No newline at end of file
+        async for chunk in stream:
+            delta = chunk.choices[0].delta.content if chunk.choices else None
+            if delta:
+                parts.append(delta)
+                yield delta
+    
+    except Exception as e:
+        logger.error(f"OpenAI API Error: {e}")
+        # Only replace the answer if nothing has been sent yet
+        if not parts:
+            yield _error_message(e)
+        return
+    
+    # Cache the complete answer so repeats take the non-streaming fast path
+    if parts:
+        _response_cache[cache_key] = "".join(parts)
+
+def _error_message(e: Exception) -> str:
+    """User-facing message for an OpenAI API error"""
+    error_str = str(e).lower()
+    if "api key" in error_str:
+        return "AI service authentication failed. Please contact support."
+    elif "quota" in error_str or "billing" in error_str:
+        return "AI service is temporarily unavailable due to usage limits. Please try again later."
+    elif "rate limit" in error_str:
+        return "AI service is busy. Please wait a moment and try again."
+    else:
+        return "I'm experiencing technical difficulties. Please try again or ask me about our bus routes, schedules, delay predictions, or any other BusTracker features."
+
+async def submit_ai_batch(user_messages: List[str]) -> Dict[str, Any]:
+    """
+    Submit non-interactive prompts through the OpenAI Batch API (lower cost, separate rate limits)
+    """
+    if not _AI_ENABLED:
+        raise HTTPException(status_code=503, detail="AI service is not configured")
+    
+    # One JSONL line per prompt; custom_id maps results back to input order
+    lines = [
+        json.dumps({
+            "custom_id": f"req-{i}",
+            "method": "POST",
+            "url": "/v1/chat/completions",
+            "body": {
+                "model": CHAT_MODEL,
+                "messages": _chat_messages(user_message),
+                "max_tokens": CHAT_MAX_TOKENS,
+                "temperature": CHAT_TEMPERATURE
+            }
+        }, separators=(",", ":"))
+        for i, user_message in enumerate(user_messages)
+    ]
+    
+    client = get_client()
+    batch_file = await client.files.create(
+        file=("batch_input.jsonl", "\n".join(lines).encode()),
+        purpose="batch"
+    )
+    batch = await client.batches.create(
+        input_file_id=batch_file.id,
+        endpoint="/v1/chat/completions",
+        completion_window="24h"
+    )
+    
+    return {"batch_id": batch.id, "status": batch.status, "request_count": len(lines)}
+
+async def get_ai_batch_results(batch_id: str) -> Dict[str, Any]:
+    """
+    Get a batch's status and, once completed, its responses in submission order
+    """
+    if not _AI_ENABLED:
+        raise HTTPException(status_code=503, detail="AI service is not configured")
+    
+    client = get_client()
+    batch = await client.batches.retrieve(batch_id)
+    
+    result = {"batch_id": batch.id, "status": batch.status, "responses": None}
+    if batch.status != "completed" or not batch.output_file_id:
+        return result
+    
+    # Output lines arrive in any order; failed requests stay None
+    output = await client.files.content(batch.output_file_id)
+    responses: Dict[int, Optional[str]] = {}
+    for line in output.text.splitlines():
+        if not line:
+            continue
+        entry = json.loads(line)
+        index = int(entry["custom_id"].split("-", 1)[1])
+        response = entry.get("response") or {}
+        if response.get("status_code") == 200:
+            responses[index] = response["body"]["choices"][0]["message"]["content"]
+    
+    total = batch.request_counts.total if batch.request_counts else len(responses)
+    result["responses"] = [responses.get(i) for i in range(total)]
+    return result
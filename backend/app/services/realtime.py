@@ -7,27 +7,51 @@ and WebSocket communication.
 
 import asyncio
 import logging
-from typing import Dict, List, Optional, Any
+import time
+from typing import Dict, List, Optional, Any, Tuple
 from datetime import datetime, timedelta
-import random
 import json
+import numpy as np
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
 
-from app.database.mongodb import database_manager
+from app.database.mongodb import database_manager, NOTIFICATION_RETENTION_SECONDS
+from app.database.cache import get_route_stops_cached
 from app.ml.prediction_engine import prediction_engine
 from app.websocket import websocket_manager
 from app.websocket.schemas import TripUpdate, NotificationAlert, BusLocation, StopArrival
-from app.models.schemas import TripStatus
+from app.models.schemas import TripStatus, TripPrediction
 
 logger = logging.getLogger(__name__)
 
+# Stats are informational, so dashboards polling them share one computation
+STATS_CACHE_TTL_SECONDS = 2.0
+
+# Max trip updates in flight at once per monitor cycle
+TRIP_UPDATE_CONCURRENCY = 50
+
+# Simulated buses start near the city centre and drift a little each cycle
+SIMULATION_CENTER = np.array([40.7128, -74.0060])  # NYC area (lat, lng)
+SIMULATION_START_SPREAD = 0.01
+SIMULATION_STEP = 0.0001
+
+# Trip fields read by the monitor loop
+ACTIVE_TRIP_PROJECTION = {"route_id": 1, "trip_start_time": 1}
+
 class RealTimeService:
     """Manages real-time trip tracking and updates"""
     
     def __init__(self):
         self.is_running = False
         self.background_tasks: List[asyncio.Task] = []
-        self.active_trips: Dict[str, Dict[str, Any]] = {}
+        
+        # Simulated positions: one (lat, lng) row per tracked trip, row looked up via _trip_index
+        self._trip_index: Dict[str, int] = {}
+        self._positions = np.empty((0, 2), dtype=np.float64)
+        self._rng = np.random.default_rng()
         self.update_interval = 30  # seconds
+        self._stats_cache: Optional[Tuple[float, Dict[str, Any]]] = None
+        self._stats_lock = asyncio.Lock()
         
     async def start(self):
         """Start the real-time service"""
@@ -69,15 +93,72 @@ class RealTimeService:
         """Monitor active trips and generate updates"""
         while self.is_running:
             try:
-                # Get active trips from database
-                trips_collection = database_manager.db.trips
+                # Get active trips from database (only the fields the update reads)
+                trips_collection = database_manager.database.trips
                 active_trips = await trips_collection.find({
                     "status": TripStatus.IN_PROGRESS
-                }).to_list(length=None)
+                }, ACTIVE_TRIP_PROJECTION).to_list(length=None)
+                
+                # One timestamp for the whole cycle
+                now = datetime.utcnow()
+                
+                # Move every simulated bus in one vectorized step
+                self._advance_positions([str(trip["_id"]) for trip in active_trips])
+                
+                # Predict every trip's current delay with one batched model call
+                predictions = await prediction_engine.predict_delays(
+                    [(trip.get("route_id"), now) for trip in active_trips]
+                )
                 
-                for trip in active_trips:
-                    trip_id = str(trip["_id"])
-                    await self._update_trip_location(trip_id, trip)
+                # Simulated telemetry for every trip, drawn in one batch: (speed km/h, heading degrees, passengers)
+                trip_count = len(active_trips)
+                telemetry = zip(
+                    self._rng.uniform(20, 50, trip_count).tolist(),
+                    self._rng.uniform(0, 360, trip_count).tolist(),
+                    self._rng.integers(5, 41, trip_count).tolist()
+                )
+                
+                # Update trips concurrently (bounded); failures are isolated per trip
+                semaphore = asyncio.Semaphore(TRIP_UPDATE_CONCURRENCY)
+                
+                async def update_trip(
+                    trip: Dict[str, Any],
+                    prediction: Optional[TripPrediction],
+                    trip_telemetry: Tuple[float, float, int]
+                ) -> Optional[TripUpdate]:
+                    async with semaphore:
+                        predicted_delay = prediction.predicted_delay_minutes if prediction else 0
+                        return await self._update_trip_location(
+                            str(trip["_id"]), trip, now, predicted_delay, trip_telemetry
+                        )
+                
+                trip_updates = [
+                    trip_update
+                    for trip_update in await asyncio.gather(*(
+                        update_trip(trip, prediction, trip_telemetry)
+                        for trip, prediction, trip_telemetry in zip(active_trips, predictions, telemetry)
+                    ))
+                    if trip_update is not None
+                ]
+                
+                # Broadcast the cycle's updates in batches
+                await websocket_manager.emit_trip_updates(trip_updates)
+                
+                # Collect this cycle's writes and flush them in bulk
+                trip_ops = []
+                delayed_updates = []
+                for trip_update in trip_updates:
+                    trip_ops.append(self._trip_update_op(trip_update.trip_id, trip_update))
+                    
+                    # Check for delay notifications
+                    if trip_update.delay_minutes > 5:  # 5+ minutes delay
+                        delayed_updates.append(trip_update)
+                
+                if trip_ops:
+                    await trips_collection.bulk_write(trip_ops, ordered=False)
+                
+                if delayed_updates:
+                    await self._create_delay_notifications(delayed_updates, now)
                     
                 await asyncio.sleep(self.update_interval)
                 
@@ -87,28 +168,24 @@ class RealTimeService:
                 logger.error(f"Error monitoring trips: {e}")
                 await asyncio.sleep(5)
     
-    async def _update_trip_location(self, trip_id: str, trip_data: Dict[str, Any]):
-        """Update trip location and status"""
+    async def _update_trip_location(
+        self,
+        trip_id: str,
+        trip_data: Dict[str, Any],
+        now: datetime,
+        current_delay: float,
+        telemetry: Tuple[float, float, int]
+    ) -> Optional[TripUpdate]:
+        """Build a trip's location/status update (broadcast and persisted in bulk by the caller)"""
         try:
             route_id = trip_data.get("route_id")
+            speed, heading, passengers_count = telemetry
             
             # Simulate location update (in real system, this would come from GPS)
-            current_location = self._simulate_bus_movement(trip_id, trip_data)
+            current_location = self._simulate_bus_movement(trip_id)
             
             # Get current and next stops
-            current_stop_id, next_stop_id = await self._get_trip_stops(trip_id, trip_data)
-            
-            # Calculate delay using ML prediction
-            delay_prediction = await prediction_engine.predict_delay({
-                "route_id": route_id,
-                "trip_id": trip_id,
-                "current_time": datetime.utcnow(),
-                "weather_condition": "clear",  # Would come from weather API
-                "traffic_level": random.uniform(0.3, 0.9),
-                "passenger_load": random.randint(5, 40)
-            })
-            
-            current_delay = delay_prediction.get("predicted_delay_minutes", 0)
+            current_stop_id, next_stop_id = await self._get_trip_stops(trip_id, trip_data, now)
             
             # Create trip update
             trip_update = TripUpdate(
@@ -117,72 +194,53 @@ class RealTimeService:
                 current_stop_id=current_stop_id,
                 next_stop_id=next_stop_id,
                 current_location=current_location,
-                speed=random.uniform(20, 50),  # km/h
-                heading=random.uniform(0, 360),  # degrees
+                speed=speed,  # km/h
+                heading=heading,  # degrees
                 delay_minutes=current_delay,
                 predicted_delay_minutes=current_delay,
                 status="active" if current_delay < 10 else "delayed",
-                passengers_count=random.randint(5, 40),
-                last_updated=datetime.utcnow()
+                passengers_count=passengers_count,
+                last_updated=now
             )
             
-            # Emit WebSocket update
-            await websocket_manager.emit_trip_update(trip_update)
-            
-            # Update database
-            await self._update_trip_in_database(trip_id, trip_update)
-            
-            # Check for delay notifications
-            if current_delay > 5:  # 5+ minutes delay
-                await self._create_delay_notification(trip_id, route_id, current_delay)
+            return trip_update
             
         except Exception as e:
             logger.error(f"Error updating trip location for {trip_id}: {e}")
+            return None
     
-    def _simulate_bus_movement(self, trip_id: str, trip_data: Dict[str, Any]) -> Dict[str, float]:
-        """Simulate realistic bus movement along route"""
+    def _advance_positions(self, trip_ids: List[str]):
+        """Place newly seen trips and advance all simulated bus positions at once"""
         # In a real system, this would be actual GPS data
-        # For simulation, we'll create realistic movement patterns
-        
-        if trip_id not in self.active_trips:
-            # Initialize trip with starting location
-            self.active_trips[trip_id] = {
-                "lat": 40.7128 + random.uniform(-0.01, 0.01),  # NYC area
-                "lng": -74.0060 + random.uniform(-0.01, 0.01),
-                "last_update": datetime.utcnow()
-            }
-        
-        trip_state = self.active_trips[trip_id]
+        new_trip_ids = [trip_id for trip_id in trip_ids if trip_id not in self._trip_index]
+        if new_trip_ids:
+            for trip_id in new_trip_ids:
+                self._trip_index[trip_id] = len(self._trip_index)
+            start_positions = SIMULATION_CENTER + self._rng.uniform(
+                -SIMULATION_START_SPREAD, SIMULATION_START_SPREAD, (len(new_trip_ids), 2)
+            )
+            self._positions = np.concatenate([self._positions, start_positions])
         
         # Simulate movement (small incremental changes)
-        lat_change = random.uniform(-0.0001, 0.0001)
-        lng_change = random.uniform(-0.0001, 0.0001)
-        
-        trip_state["lat"] += lat_change
-        trip_state["lng"] += lng_change
-        trip_state["last_update"] = datetime.utcnow()
-        
-        return {
-            "lat": trip_state["lat"],
-            "lng": trip_state["lng"]
-        }
+        self._positions += self._rng.uniform(-SIMULATION_STEP, SIMULATION_STEP, self._positions.shape)
     
-    async def _get_trip_stops(self, trip_id: str, trip_data: Dict[str, Any]) -> tuple:
+    def _simulate_bus_movement(self, trip_id: str) -> Dict[str, float]:
+        """Current simulated location of a trip (advanced by _advance_positions)"""
+        lat, lng = self._positions[self._trip_index[trip_id]].tolist()
+        return {"lat": lat, "lng": lng}
+    
+    async def _get_trip_stops(self, trip_id: str, trip_data: Dict[str, Any], now: datetime) -> tuple:
         """Get current and next stops for a trip"""
         try:
-            # Get route stops
-            routes_collection = database_manager.db.routes
-            route = await routes_collection.find_one({"_id": trip_data.get("route_id")})
+            # Get route stops (process-local, short TTL, invalidated on route edits)
+            stops = await get_route_stops_cached(trip_data.get("route_id"))
             
-            if not route or not route.get("stops"):
+            if not stops:
                 return None, None
             
-            stops = route["stops"]
-            
             # Simulate progression through stops
-            current_time = datetime.utcnow()
-            trip_start = trip_data.get("start_time", current_time)
-            minutes_elapsed = (current_time - trip_start).total_seconds() / 60
+            trip_start = trip_data.get("trip_start_time") or now
+            minutes_elapsed = (now - trip_start).total_seconds() / 60
             
             # Estimate current position (assuming 2 minutes per stop)
             stop_index = min(int(minutes_elapsed / 2), len(stops) - 1)
@@ -195,86 +253,112 @@ class RealTimeService:
             logger.error(f"Error getting trip stops: {e}")
             return None, None
     
-    async def _update_trip_in_database(self, trip_id: str, trip_update: TripUpdate):
-        """Update trip information in database"""
-        try:
-            trips_collection = database_manager.db.trips
-            
-            update_data = {
-                "current_location": trip_update.current_location,
-                "current_stop_id": trip_update.current_stop_id,
-                "next_stop_id": trip_update.next_stop_id,
-                "delay_minutes": trip_update.delay_minutes,
-                "last_updated": trip_update.last_updated,
-                "status": trip_update.status
-            }
-            
-            await trips_collection.update_one(
-                {"_id": trip_id},
-                {"$set": update_data}
-            )
-            
-        except Exception as e:
-            logger.error(f"Error updating trip in database: {e}")
+    def _trip_update_op(self, trip_id: str, trip_update: TripUpdate) -> UpdateOne:
+        """Build the bulk write operation persisting a trip update"""
+        update_data = {
+            "current_location": trip_update.current_location,
+            "current_stop_id": trip_update.current_stop_id,
+            "next_stop_id": trip_update.next_stop_id,
+            "delay_minutes": trip_update.delay_minutes,
+            "last_updated": trip_update.last_updated,
+            "status": trip_update.status
+        }
+        
+        return UpdateOne({"_id": trip_id}, {"$set": update_data})
     
-    async def _create_delay_notification(self, trip_id: str, route_id: str, delay_minutes: float):
-        """Create notifications for significant delays"""
+    async def _create_delay_notifications(self, delayed_updates: List[TripUpdate], now: datetime):
+        """Create notifications for a cycle's significantly delayed trips"""
         try:
-            # Get users subscribed to this route
-            subscriptions_collection = database_manager.db.subscriptions
+            # Get users subscribed to any delayed route in one query
+            subscriptions_collection = database_manager.database.subscriptions
             subscriptions = await subscriptions_collection.find({
-                "route_id": route_id,
+                "route_id": {"$in": list({update.route_id for update in delayed_updates})},
                 "is_active": True
-            }).to_list(length=None)
-            
-            # Create notifications for each subscriber
-            notifications_collection = database_manager.db.notifications
+            }, {"user_id": 1, "route_id": 1}).to_list(length=None)
             
+            subscribers_by_route: Dict[str, List[str]] = {}
             for subscription in subscriptions:
-                user_id = subscription["user_id"]
-                
-                # Check if we already sent a delay notification for this trip
-                existing_notification = await notifications_collection.find_one({
-                    "user_id": user_id,
-                    "trip_id": trip_id,
-                    "type": "delay"
-                })
-                
-                if existing_notification:
-                    continue  # Already notified
+                subscribers_by_route.setdefault(subscription["route_id"], []).append(subscription["user_id"])
+            
+            notifications_collection = database_manager.database.notifications
+            users_collection = database_manager.database.users
+            
+            # Build a candidate notification for every subscriber of each delayed trip
+            candidates = []
+            created_at = now
+            for trip_update in delayed_updates:
+                route_id = trip_update.route_id
+                subscriber_ids = subscribers_by_route.get(route_id)
+                if not subscriber_ids:
+                    continue
                 
-                # Create notification
-                notification_data = {
-                    "user_id": user_id,
-                    "title": f"Bus Delay Alert",
+                # Fields shared by every subscriber of the trip, formatted once
+                delay_minutes = trip_update.delay_minutes
+                base_notification = {
+                    "title": "Bus Delay Alert",
                     "message": f"Your bus on route {route_id} is delayed by {delay_minutes:.0f} minutes",
                     "type": "delay",
                     "priority": "high" if delay_minutes > 15 else "normal",
                     "route_id": route_id,
-                    "trip_id": trip_id,
+                    "trip_id": trip_update.trip_id,
                     "is_read": False,
-                    "created_at": datetime.utcnow()
+                    "created_at": created_at
                 }
                 
-                result = await notifications_collection.insert_one(notification_data)
-                notification_id = str(result.inserted_id)
-                
-                # Send WebSocket notification
-                notification_alert = NotificationAlert(
-                    user_id=user_id,
-                    notification_id=notification_id,
+                candidates.extend({**base_notification, "user_id": user_id} for user_id in subscriber_ids)
+            
+            if not candidates:
+                return
+            
+            # Insert in one unordered batch; the unique (user, trip, type) index
+            # rejects users already notified about a trip
+            duplicate_indexes = set()
+            try:
+                await notifications_collection.insert_many(candidates, ordered=False)
+            except BulkWriteError as e:
+                write_errors = e.details.get("writeErrors", [])
+                if any(error.get("code") != 11000 for error in write_errors):
+                    raise
+                duplicate_indexes = {error["index"] for error in write_errors}
+            
+            # insert_many assigns each document's _id client-side
+            new_notifications = [
+                notification_data for i, notification_data in enumerate(candidates)
+                if i not in duplicate_indexes
+            ]
+            if not new_notifications:
+                return
+            
+            # Bump unread counters in one round-trip
+            unread_increments: Dict[str, int] = {}
+            for notification_data in new_notifications:
+                unread_increments[notification_data["user_id"]] = unread_increments.get(notification_data["user_id"], 0) + 1
+            
+            await users_collection.bulk_write([
+                UpdateOne(
+                    {"_id": user_id, "unread_notif_count": {"$exists": True}},
+                    {"$inc": {"unread_notif_count": count}}
+                )
+                for user_id, count in unread_increments.items()
+            ], ordered=False)
+            
+            # Send WebSocket notifications in batches
+            await websocket_manager.emit_notifications([
+                NotificationAlert(
+                    user_id=notification_data["user_id"],
+                    notification_id=str(notification_data["_id"]),
                     title=notification_data["title"],
                     message=notification_data["message"],
                     type=notification_data["type"],
                     priority=notification_data["priority"],
-                    route_id=route_id,
-                    trip_id=trip_id
+                    route_id=notification_data["route_id"],
+                    trip_id=notification_data["trip_id"]
                 )
-                
-                await websocket_manager.emit_notification(notification_alert)
+                for notification_data in new_notifications
+            ])
                 
         except Exception as e:
-            logger.error(f"Error creating delay notification: {e}")
+            logger.error(f"Error creating delay notifications: {e}")
     
     async def _update_predictions(self):
         """Periodically update ML predictions"""
@@ -293,15 +377,32 @@ class RealTimeService:
                 await asyncio.sleep(300)  # 5 minutes
     
     async def _process_notifications(self):
-        """Process and clean up old notifications"""
+        """Clean up old unread notifications (read ones expire via the TTL index)"""
         while self.is_running:
             try:
-                # Clean up old notifications (older than 30 days)
-                cutoff_date = datetime.utcnow() - timedelta(days=30)
-                notifications_collection = database_manager.db.notifications
+                # Clean up old unread notifications (older than 30 days)
+                cutoff_date = datetime.utcnow() - timedelta(seconds=NOTIFICATION_RETENTION_SECONDS)
+                notifications_collection = database_manager.database.notifications
+                users_collection = database_manager.database.users
+                
+                # Adjust cached unread counters for unread notifications being removed
+                unread_counts = await notifications_collection.aggregate([
+                    {"$match": {"created_at": {"$lt": cutoff_date}, "is_read": False}},
+                    {"$group": {"_id": "$user_id", "count": {"$sum": 1}}}
+                ]).to_list(length=None)
+                
+                if unread_counts:
+                    await users_collection.bulk_write([
+                        UpdateOne(
+                            {"_id": entry["_id"], "unread_notif_count": {"$exists": True}},
+                            {"$inc": {"unread_notif_count": -entry["count"]}}
+                        )
+                        for entry in unread_counts
+                    ], ordered=False)
                 
                 result = await notifications_collection.delete_many({
-                    "created_at": {"$lt": cutoff_date}
+                    "created_at": {"$lt": cutoff_date},
+                    "is_read": False
                 })
                 
                 if result.deleted_count > 0:
@@ -316,22 +417,37 @@ class RealTimeService:
                 await asyncio.sleep(3600)  # 1 hour
     
     async def get_realtime_stats(self) -> Dict[str, Any]:
-        """Get real-time service statistics"""
-        try:
-            trips_collection = database_manager.db.trips
-            notifications_collection = database_manager.db.notifications
+        """Get real-time service statistics, cached for STATS_CACHE_TTL_SECONDS"""
+        if self._stats_cache and time.monotonic() - self._stats_cache[0] < STATS_CACHE_TTL_SECONDS:
+            return self._stats_cache[1]
+        
+        # Single-flight: concurrent callers wait for one refresh
+        async with self._stats_lock:
+            if self._stats_cache and time.monotonic() - self._stats_cache[0] < STATS_CACHE_TTL_SECONDS:
+                return self._stats_cache[1]
             
-            # Count active trips
-            active_trips_count = await trips_collection.count_documents({
-                "status": TripStatus.IN_PROGRESS
-            })
+            stats = await self._compute_realtime_stats()
+            if stats.get("service_status") != "error":
+                self._stats_cache = (time.monotonic(), stats)
+            return stats
+    
+    async def _compute_realtime_stats(self) -> Dict[str, Any]:
+        """Query real-time service statistics"""
+        try:
+            trips_collection = database_manager.database.trips
+            notifications_collection = database_manager.database.notifications
             
-            # Count unread notifications (last 24 hours)
+            # Count active trips and unread notifications (last 24 hours) concurrently
             yesterday = datetime.utcnow() - timedelta(hours=24)
-            unread_notifications = await notifications_collection.count_documents({
-                "is_read": False,
-                "created_at": {"$gte": yesterday}
-            })
+            active_trips_count, unread_notifications = await asyncio.gather(
+                trips_collection.count_documents({
+                    "status": TripStatus.IN_PROGRESS
+                }),
+                notifications_collection.count_documents({
+                    "is_read": False,
+                    "created_at": {"$gte": yesterday}
+                })
+            )
             
             # WebSocket stats
             ws_stats = websocket_manager.get_connection_stats()
@@ -339,7 +455,7 @@ class RealTimeService:
             return {
                 "service_status": "running" if self.is_running else "stopped",
                 "active_trips": active_trips_count,
-                "tracked_locations": len(self.active_trips),
+                "tracked_locations": len(self._trip_index),
                 "unread_notifications_24h": unread_notifications,
                 "websocket_connections": ws_stats["total_connections"],
                 "update_interval_seconds": self.update_interval,
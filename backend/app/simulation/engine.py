@@ -8,33 +8,78 @@ It calculates position based on schedule data and simulates realistic delays.
 import asyncio
 import logging
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
 import math
 import random
 from dataclasses import dataclass
+import numpy as np
+from cachetools import LRUCache
+from pymongo import UpdateOne
 
 from app.core.config import settings
 from app.models.schemas import Trip, TripStatus, TripPosition, Coordinate
-from app.database.mongodb import get_trips_collection, get_routes_collection, get_stops_collection
+from app.database.mongodb import get_trips_collection, get_stops_collection
+from app.database.cache import get_route_cached
 
 logger = logging.getLogger(__name__)
 
-@dataclass
+EARTH_RADIUS_KM = 6371
+
+# Equirectangular error stays well under 0.1% below this; longer segments use Haversine
+EQUIRECTANGULAR_MAX_KM = 50.0
+
+# Process-wide route segments keyed by (route_id, route updated_at); bounded so route churn can't grow it
+ROUTE_SEGMENTS_CACHE_SIZE = 256
+_route_segments_cache: LRUCache = LRUCache(maxsize=ROUTE_SEGMENTS_CACHE_SIZE)
+
+def haversine_km_vector(lats1: np.ndarray, lons1: np.ndarray, lats2: np.ndarray, lons2: np.ndarray) -> np.ndarray:
+    """Haversine distances (km) between paired coordinate arrays, in radians"""
+    a = np.sin((lats2 - lats1) / 2) ** 2 + np.cos(lats1) * np.cos(lats2) * np.sin((lons2 - lons1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+def equirectangular_km_vector(lats1: np.ndarray, lons1: np.ndarray, lats2: np.ndarray, lons2: np.ndarray) -> np.ndarray:
+    """Equirectangular distances (km) between paired coordinate arrays, in radians"""
+    x = (lons2 - lons1) * np.cos((lats1 + lats2) / 2)
+    y = lats2 - lats1
+    return EARTH_RADIUS_KM * np.sqrt(x * x + y * y)
+
+def segment_distances_km(lats1: np.ndarray, lons1: np.ndarray, lats2: np.ndarray, lons2: np.ndarray) -> np.ndarray:
+    """Intra-city segment distances (km): equirectangular, Haversine for long segments (radians)"""
+    distances = equirectangular_km_vector(lats1, lons1, lats2, lons2)
+    long_segments = distances > EQUIRECTANGULAR_MAX_KM
+    if long_segments.any():
+        distances[long_segments] = haversine_km_vector(
+            lats1[long_segments], lons1[long_segments], lats2[long_segments], lons2[long_segments]
+        )
+    return distances
+
+class _Coord(NamedTuple):
+    """Engine-internal coordinate (no validation); converted to Coordinate for TripPosition"""
+    latitude: float
+    longitude: float
+
+@dataclass(frozen=True)
 class RouteSegment:
     """Represents a segment between two stops"""
     start_stop_id: str
     end_stop_id: str
     distance_km: float
     expected_duration_minutes: float
-    start_location: Coordinate
-    end_location: Coordinate
+    start_location: _Coord
+    end_location: _Coord
+    # Segment-invariant values precomputed for the per-tick position update
+    inv_distance_km: float
+    dlat: float
+    dlon: float
 
 class BusSimulator:
     """Simulates individual bus movement"""
     
     def __init__(self, trip_id: str):
         self.trip_id = trip_id
+        self.route_segments: Sequence[RouteSegment] = ()
         self.current_segment: Optional[RouteSegment] = None
+        self.current_segment_index: int = 0
         self.segment_progress: float = 0.0  # 0.0 to 1.0
         self.base_speed_kmh: float = settings.DEFAULT_BUS_SPEED
         self.current_speed_kmh: float = self.base_speed_kmh
@@ -42,7 +87,7 @@ class BusSimulator:
         
     def calculate_distance_km(self, coord1: Coordinate, coord2: Coordinate) -> float:
         """Calculate distance between two coordinates using Haversine formula"""
-        R = 6371  # Earth's radius in kilometers
+        R = EARTH_RADIUS_KM
         
         lat1, lon1 = math.radians(coord1.latitude), math.radians(coord1.longitude)
         lat2, lon2 = math.radians(coord2.latitude), math.radians(coord2.longitude)
@@ -98,25 +143,26 @@ class BusSimulator:
                 
         return total_delay
     
-    async def update_position(self, time_step_seconds: int = 1) -> Optional[TripPosition]:
+    async def update_position(self, time_step_seconds: int = 1, now: Optional[datetime] = None) -> Optional[TripPosition]:
         """Update bus position based on time step simulation"""
         if not self.current_segment:
             return None
         
+        if now is None:
+            now = datetime.utcnow()
+        
         # Calculate movement in this time step
         time_step_hours = time_step_seconds / 3600.0
         distance_moved_km = self.current_speed_kmh * time_step_hours
         
-        # Update segment progress
-        if self.current_segment.distance_km > 0:
-            progress_delta = distance_moved_km / self.current_segment.distance_km
-            self.segment_progress = min(1.0, self.segment_progress + progress_delta)
+        # Update segment progress (zero-length segments have inv_distance_km 0)
+        segment = self.current_segment
+        self.segment_progress = min(1.0, self.segment_progress + distance_moved_km * segment.inv_distance_km)
         
         # Calculate current position
-        current_location = self.interpolate_position(
-            self.current_segment.start_location,
-            self.current_segment.end_location,
-            self.segment_progress
+        current_location = _Coord(
+            segment.start_location.latitude + segment.dlat * self.segment_progress,
+            segment.start_location.longitude + segment.dlon * self.segment_progress
         )
         
         # Calculate distance to next stop
@@ -125,37 +171,31 @@ class BusSimulator:
         # Estimate arrival time (considering current speed and potential delays)
         if self.current_speed_kmh > 0:
             time_to_arrival_hours = distance_to_next_stop / self.current_speed_kmh
-            estimated_arrival = datetime.utcnow() + timedelta(hours=time_to_arrival_hours)
+            estimated_arrival = now + timedelta(hours=time_to_arrival_hours)
         else:
-            estimated_arrival = datetime.utcnow() + timedelta(minutes=30)  # Default estimate
+            estimated_arrival = now + timedelta(minutes=30)  # Default estimate
         
         # Create position update
         position = TripPosition(
-            location=current_location,
+            location=Coordinate(latitude=current_location.latitude, longitude=current_location.longitude),
             next_stop_id=self.current_segment.end_stop_id,
             distance_to_next_stop_km=distance_to_next_stop,
             estimated_arrival=estimated_arrival,
-            last_updated=datetime.utcnow()
+            last_updated=now
         )
         
         return position
     
-    async def advance_to_next_segment(self, route_segments: List[RouteSegment]) -> bool:
+    async def advance_to_next_segment(self) -> bool:
         """Advance to the next segment in the route"""
         if not self.current_segment:
             return False
         
-        # Find current segment index
-        current_index = -1
-        for i, segment in enumerate(route_segments):
-            if (segment.start_stop_id == self.current_segment.start_stop_id and 
-                segment.end_stop_id == self.current_segment.end_stop_id):
-                current_index = i
-                break
-        
         # Move to next segment
-        if current_index >= 0 and current_index + 1 < len(route_segments):
-            self.current_segment = route_segments[current_index + 1]
+        next_index = self.current_segment_index + 1
+        if next_index < len(self.route_segments):
+            self.current_segment_index = next_index
+            self.current_segment = self.route_segments[next_index]
             self.segment_progress = 0.0
             
             # Apply delays for this segment
@@ -182,7 +222,6 @@ class SimulationEngine:
     
     def __init__(self):
         self.active_simulators: Dict[str, BusSimulator] = {}
-        self.route_segments_cache: Dict[str, List[RouteSegment]] = {}
         self.is_running = False
         self.simulation_task: Optional[asyncio.Task] = None
     
@@ -210,13 +249,14 @@ class SimulationEngine:
         """Main simulation loop"""
         while self.is_running:
             try:
-                await self._update_all_trips()
+                # One timestamp for every trip in this tick
+                await self._update_all_trips(datetime.utcnow())
                 await asyncio.sleep(settings.SIMULATION_STEP_INTERVAL)
             except Exception as e:
                 logger.error(f"Error in simulation loop: {e}")
                 await asyncio.sleep(5)  # Wait before retrying
     
-    async def _update_all_trips(self):
+    async def _update_all_trips(self, now: datetime):
         """Update all active trips"""
         trips_collection = get_trips_collection()
         
@@ -225,18 +265,29 @@ class SimulationEngine:
             "status": {"$in": [TripStatus.SCHEDULED, TripStatus.IN_PROGRESS]}
         }).to_list(length=None)
         
-        for trip_data in active_trips:
-            trip_id = trip_data["_id"]
-            
-            # Create simulator if not exists
-            if trip_id not in self.active_simulators:
-                await self._create_simulator(trip_id, trip_data)
-            
-            simulator = self.active_simulators.get(trip_id)
-            if simulator:
-                await self._update_trip_simulation(trip_id, simulator, trip_data)
+        # Create simulators for newly active trips
+        new_trips = [
+            trip_data for trip_data in active_trips
+            if trip_data["_id"] not in self.active_simulators
+        ]
+        if new_trips:
+            await asyncio.gather(*(
+                self._create_simulator(trip_data["_id"], trip_data, now)
+                for trip_data in new_trips
+            ))
+        
+        # Step every simulator, then persist the tick's positions in one round trip
+        trip_ops = await asyncio.gather(*(
+            self._update_trip_simulation(trip_data["_id"], self.active_simulators[trip_data["_id"]], trip_data, now)
+            for trip_data in active_trips
+            if trip_data["_id"] in self.active_simulators
+        ))
+        trip_ops = [op for op in trip_ops if op is not None]
+        
+        if trip_ops:
+            await trips_collection.bulk_write(trip_ops, ordered=False)
     
-    async def _create_simulator(self, trip_id: str, trip_data: dict):
+    async def _create_simulator(self, trip_id: str, trip_data: dict, now: datetime):
         """Create a new bus simulator for a trip"""
         try:
             simulator = BusSimulator(trip_id)
@@ -245,6 +296,7 @@ class SimulationEngine:
             # Get route segments
             route_segments = await self._get_route_segments(route_id)
             if route_segments:
+                simulator.route_segments = route_segments
                 simulator.current_segment = route_segments[0]
                 self.active_simulators[trip_id] = simulator
                 
@@ -255,7 +307,7 @@ class SimulationEngine:
                     {
                         "$set": {
                             "status": TripStatus.IN_PROGRESS,
-                            "updated_at": datetime.utcnow()
+                            "updated_at": now
                         }
                     }
                 )
@@ -265,55 +317,56 @@ class SimulationEngine:
         except Exception as e:
             logger.error(f"Failed to create simulator for trip {trip_id}: {e}")
     
-    async def _update_trip_simulation(self, trip_id: str, simulator: BusSimulator, trip_data: dict):
-        """Update individual trip simulation"""
+    async def _update_trip_simulation(self, trip_id: str, simulator: BusSimulator, trip_data: dict, now: datetime) -> Optional[UpdateOne]:
+        """Update individual trip simulation, returning the trip's database update"""
         try:
             # Update position
-            new_position = await simulator.update_position(settings.SIMULATION_STEP_INTERVAL)
+            new_position = await simulator.update_position(settings.SIMULATION_STEP_INTERVAL, now)
             
             if new_position:
+                completed_stops = trip_data.get("completed_stops", [])
+                
                 # Check if reached next stop
                 if new_position.distance_to_next_stop_km < 0.1:  # Within 100 meters
                     # Add to completed stops
-                    completed_stops = trip_data.get("completed_stops", [])
                     next_stop_id = new_position.next_stop_id
                     
                     if next_stop_id not in completed_stops:
                         completed_stops.append(next_stop_id)
                     
                     # Advance to next segment
-                    route_segments = await self._get_route_segments(trip_data["route_id"])
-                    has_next_segment = await simulator.advance_to_next_segment(route_segments)
+                    has_next_segment = await simulator.advance_to_next_segment()
                     
                     if not has_next_segment:
                         # Trip completed
                         await self._complete_trip(trip_id)
-                        return
+                        return None
                     
                     # Update next stop
                     if simulator.current_segment:
                         new_position.next_stop_id = simulator.current_segment.end_stop_id
                 
-                # Update trip in database
-                trips_collection = get_trips_collection()
-                await trips_collection.update_one(
+                # Emit WebSocket update (will be implemented in websocket module)
+                # await websocket_manager.emit_trip_update(trip_id, new_position)
+                
+                # Trip update, written with the rest of the tick
+                return UpdateOne(
                     {"_id": trip_id},
                     {
                         "$set": {
-                            "current_position": new_position.dict(),
+                            "current_position": new_position.model_dump(),
                             "delay_minutes": simulator.accumulated_delay_minutes,
                             "next_stop_id": new_position.next_stop_id,
-                            "completed_stops": trip_data.get("completed_stops", []),
-                            "updated_at": datetime.utcnow()
+                            "completed_stops": completed_stops,
+                            "updated_at": now
                         }
                     }
                 )
                 
-                # Emit WebSocket update (will be implemented in websocket module)
-                # await websocket_manager.emit_trip_update(trip_id, new_position)
-                
         except Exception as e:
             logger.error(f"Failed to update trip simulation {trip_id}: {e}")
+        
+        return None
     
     async def _complete_trip(self, trip_id: str):
         """Mark trip as completed"""
@@ -338,19 +391,20 @@ class SimulationEngine:
         except Exception as e:
             logger.error(f"Failed to complete trip {trip_id}: {e}")
     
-    async def _get_route_segments(self, route_id: str) -> List[RouteSegment]:
-        """Get route segments with caching"""
-        if route_id in self.route_segments_cache:
-            return self.route_segments_cache[route_id]
-        
+    async def _get_route_segments(self, route_id: str) -> Tuple[RouteSegment, ...]:
+        """Get route segments with caching (an edited route gets a new cache key)"""
         try:
-            routes_collection = get_routes_collection()
             stops_collection = get_stops_collection()
             
             # Get route
-            route = await routes_collection.find_one({"_id": route_id})
+            route = await get_route_cached(route_id)
             if not route:
-                return []
+                return ()
+            
+            cache_key = (route_id, route.get("updated_at"))
+            segments = _route_segments_cache.get(cache_key)
+            if segments is not None:
+                return segments
             
             stop_ids = route["stops"]
             segments = []
@@ -360,42 +414,57 @@ class SimulationEngine:
             async for stop in stops_collection.find({"_id": {"$in": stop_ids}}):
                 stops_data[stop["_id"]] = stop
             
+            # Consecutive stop pairs where both stops exist
+            pairs = [
+                (start_stop_id, end_stop_id)
+                for start_stop_id, end_stop_id in zip(stop_ids, stop_ids[1:])
+                if start_stop_id in stops_data and end_stop_id in stops_data
+            ]
+            
+            # Calculate all segment distances in one vectorized pass (radians converted once)
+            coords = np.radians(np.array([
+                (
+                    stops_data[start_stop_id]["location"]["latitude"],
+                    stops_data[start_stop_id]["location"]["longitude"],
+                    stops_data[end_stop_id]["location"]["latitude"],
+                    stops_data[end_stop_id]["location"]["longitude"]
+                )
+                for start_stop_id, end_stop_id in pairs
+            ], dtype=float).reshape(-1, 4))
+            distances_km = segment_distances_km(*coords.T).tolist()
+            
             # Create segments between consecutive stops
-            for i in range(len(stop_ids) - 1):
-                start_stop_id = stop_ids[i]
-                end_stop_id = stop_ids[i + 1]
+            for (start_stop_id, end_stop_id), distance_km in zip(pairs, distances_km):
+                # Estimate duration (assuming average speed)
+                expected_duration_minutes = (distance_km / settings.DEFAULT_BUS_SPEED) * 60
                 
-                start_stop = stops_data.get(start_stop_id)
-                end_stop = stops_data.get(end_stop_id)
+                start_stop_location = stops_data[start_stop_id]["location"]
+                end_stop_location = stops_data[end_stop_id]["location"]
+                start_location = _Coord(start_stop_location["latitude"], start_stop_location["longitude"])
+                end_location = _Coord(end_stop_location["latitude"], end_stop_location["longitude"])
                 
-                if start_stop and end_stop:
-                    start_location = Coordinate(**start_stop["location"])
-                    end_location = Coordinate(**end_stop["location"])
-                    
-                    # Calculate distance
-                    distance_km = BusSimulator("dummy").calculate_distance_km(start_location, end_location)
-                    
-                    # Estimate duration (assuming average speed)
-                    expected_duration_minutes = (distance_km / settings.DEFAULT_BUS_SPEED) * 60
-                    
-                    segment = RouteSegment(
-                        start_stop_id=start_stop_id,
-                        end_stop_id=end_stop_id,
-                        distance_km=distance_km,
-                        expected_duration_minutes=expected_duration_minutes,
-                        start_location=start_location,
-                        end_location=end_location
-                    )
-                    
-                    segments.append(segment)
+                segment = RouteSegment(
+                    start_stop_id=start_stop_id,
+                    end_stop_id=end_stop_id,
+                    distance_km=distance_km,
+                    expected_duration_minutes=expected_duration_minutes,
+                    start_location=start_location,
+                    end_location=end_location,
+                    inv_distance_km=1.0 / distance_km if distance_km > 0 else 0.0,
+                    dlat=end_location.latitude - start_location.latitude,
+                    dlon=end_location.longitude - start_location.longitude
+                )
+                
+                segments.append(segment)
             
             # Cache segments
-            self.route_segments_cache[route_id] = segments
+            segments = tuple(segments)
+            _route_segments_cache[cache_key] = segments
             return segments
             
         except Exception as e:
             logger.error(f"Failed to get route segments for {route_id}: {e}")
-            return []
+            return ()
 
 # Global simulation engine instance
 simulation_engine = SimulationEngine()
\ No newline at end of file
@@ -18,6 +18,9 @@ from app.models.schemas import TripUpdate, NotificationAlert, WebSocketMessage
 
 logger = logging.getLogger(__name__)
 
+# Emits awaited together before yielding to the event loop during bulk fan-out
+EMIT_BATCH_SIZE = 50
+
 class WebSocketManager:
     """Manages WebSocket connections and real-time communication"""
     
@@ -33,6 +36,7 @@ class WebSocketManager:
         self.user_sessions: Dict[str, Set[str]] = {}  # user_id -> set of session_ids
         self.route_subscribers: Dict[str, Set[str]] = {}  # route_id -> set of session_ids
         self.trip_subscribers: Dict[str, Set[str]] = {}  # trip_id -> set of session_ids
+        self.authenticated_count = 0  # maintained on connect/disconnect for O(1) stats
         
         # Setup event handlers
         self._setup_event_handlers()
@@ -40,6 +44,7 @@ class WebSocketManager:
         # Background tasks
         self.background_tasks: List[asyncio.Task] = []
         self.is_running = False
+        self.started_at: Optional[datetime] = None
     
     def _setup_event_handlers(self):
         """Setup WebSocket event handlers"""
@@ -80,6 +85,8 @@ class WebSocketManager:
                     logger.warning(f"Authentication failed for client {sid}: {e}")
             
             self.connected_clients[sid] = client_info
+            if client_info["authenticated"]:
+                self.authenticated_count += 1
             
             # Send connection status
             await self.sio.emit('connection_status', {
@@ -121,6 +128,8 @@ class WebSocketManager:
                         del self.trip_subscribers[trip_id]
             
             # Remove client
+            if client_info.get("authenticated"):
+                self.authenticated_count -= 1
             del self.connected_clients[sid]
             
             logger.info(f"Client {sid} disconnected")
@@ -311,6 +320,7 @@ class WebSocketManager:
             return
         
         self.is_running = True
+        self.started_at = datetime.utcnow()
         
         # Start background tasks
         heartbeat_task = asyncio.create_task(self._heartbeat_task())
@@ -366,52 +376,73 @@ class WebSocketManager:
     async def emit_trip_update(self, trip_update: TripUpdate):
         """Emit trip update to subscribers"""
         try:
-            message_data = {
-                'type': 'trip_update',
-                'data': trip_update.dict(),
-                'timestamp': datetime.utcnow().isoformat()
-            }
-            
-            # Emit to trip subscribers
+            # Trip and route subscribers, each client once
             trip_id = trip_update.trip_id
-            if trip_id in self.trip_subscribers:
-                subscriber_sids = list(self.trip_subscribers[trip_id])
-                for sid in subscriber_sids:
-                    await self.sio.emit('trip_update', trip_update.dict(), to=sid)
+            subscriber_sids = self.trip_subscribers.get(trip_id, set()) | \
+                self.route_subscribers.get(trip_update.route_id, set())
             
-            # Emit to route subscribers
-            route_id = trip_update.route_id
-            if route_id in self.route_subscribers:
-                subscriber_sids = list(self.route_subscribers[route_id])
-                for sid in subscriber_sids:
-                    await self.sio.emit('trip_update', trip_update.dict(), to=sid)
+            # One emit: the packet is encoded once and sent to every sid
+            if subscriber_sids:
+                await self.sio.emit(
+                    'trip_update',
+                    trip_update.model_dump(mode="json"),
+                    to=list(subscriber_sids)
+                )
             
             logger.debug(f"Emitted trip update for trip {trip_id}")
             
         except Exception as e:
             logger.error(f"Error emitting trip update: {e}")
     
+    async def emit_trip_updates(self, trip_updates: List[TripUpdate]):
+        """Emit many trip updates in batches, yielding to the event loop between batches"""
+        for i in range(0, len(trip_updates), EMIT_BATCH_SIZE):
+            await asyncio.gather(*(
+                self.emit_trip_update(trip_update)
+                for trip_update in trip_updates[i:i + EMIT_BATCH_SIZE]
+            ))
+            await asyncio.sleep(0)
+    
     async def emit_notification(self, notification_alert: NotificationAlert):
         """Emit notification to specific user"""
         try:
             user_id = notification_alert.user_id
             
             if user_id in self.user_sessions:
-                message_data = {
-                    'type': 'notification',
-                    'data': notification_alert.dict(),
-                    'timestamp': datetime.utcnow().isoformat()
-                }
-                
-                # Send to all user sessions
-                for sid in self.user_sessions[user_id]:
-                    await self.sio.emit('notification', notification_alert.dict(), to=sid)
+                # Send to all user sessions with a single encode
+                await self.sio.emit(
+                    'notification',
+                    notification_alert.model_dump(mode="json"),
+                    to=list(self.user_sessions[user_id])
+                )
                 
                 logger.debug(f"Emitted notification to user {user_id}")
             
         except Exception as e:
             logger.error(f"Error emitting notification: {e}")
     
+    async def emit_notifications(self, notification_alerts: List[NotificationAlert]):
+        """Emit many notifications in batches, yielding to the event loop between batches"""
+        for i in range(0, len(notification_alerts), EMIT_BATCH_SIZE):
+            await asyncio.gather(*(
+                self.emit_notification(notification_alert)
+                for notification_alert in notification_alerts[i:i + EMIT_BATCH_SIZE]
+            ))
+            await asyncio.sleep(0)
+    
+    async def emit_ai_chunk(self, user_id: str, delta: str, done: bool = False):
+        """Emit a streamed AI chat delta to all of a user's sessions"""
+        try:
+            if user_id in self.user_sessions:
+                await self.sio.emit(
+                    'ai_chunk',
+                    {'delta': delta, 'done': done},
+                    to=list(self.user_sessions[user_id])
+                )
+        
+        except Exception as e:
+            logger.error(f"Error emitting AI chunk: {e}")
+    
     async def emit_system_alert(self, message: str, alert_type: str = "info"):
         """Emit system-wide alert to all connected clients"""
         try:
@@ -441,9 +472,11 @@ class WebSocketManager:
                     'timestamp': datetime.utcnow().isoformat()
                 }
                 
-                subscriber_sids = list(self.route_subscribers[route_id])
-                for sid in subscriber_sids:
-                    await self.sio.emit('route_status', message_data, to=sid)
+                await self.sio.emit(
+                    'route_status',
+                    message_data,
+                    to=list(self.route_subscribers[route_id])
+                )
                 
                 logger.debug(f"Emitted route status for route {route_id}")
             
@@ -451,20 +484,17 @@ class WebSocketManager:
             logger.error(f"Error emitting route status: {e}")
     
     def get_connection_stats(self) -> Dict[str, Any]:
-        """Get connection statistics"""
-        authenticated_count = sum(
-            1 for client in self.connected_clients.values()
-            if client.get("authenticated", False)
-        )
+        """Get connection statistics (O(1): counters only, no client walk)"""
+        total_connections = len(self.connected_clients)
         
         return {
-            "total_connections": len(self.connected_clients),
-            "authenticated_connections": authenticated_count,
-            "anonymous_connections": len(self.connected_clients) - authenticated_count,
+            "total_connections": total_connections,
+            "authenticated_connections": self.authenticated_count,
+            "anonymous_connections": total_connections - self.authenticated_count,
             "unique_users": len(self.user_sessions),
             "route_subscriptions": len(self.route_subscribers),
             "trip_subscriptions": len(self.trip_subscribers),
-            "uptime_seconds": (datetime.utcnow() - datetime.utcnow()).total_seconds() if self.is_running else 0
+            "uptime_seconds": (datetime.utcnow() - self.started_at).total_seconds() if self.is_running and self.started_at else 0
         }
 
 # Global WebSocket manager instance
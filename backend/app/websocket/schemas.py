@@ -6,16 +6,23 @@ Defines data structures for WebSocket messages and real-time updates.
 
 from datetime import datetime
 from typing import Optional, Dict, Any, List
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
+
+# Immutable config for messages built and broadcast on every tick
+FROZEN_MESSAGE_CONFIG = ConfigDict(frozen=True)
 
 class WebSocketMessage(BaseModel):
     """Base WebSocket message structure"""
+    model_config = FROZEN_MESSAGE_CONFIG
+    
     type: str = Field(..., description="Message type")
     data: Dict[str, Any] = Field(default_factory=dict, description="Message data")
     timestamp: datetime = Field(default_factory=datetime.utcnow, description="Message timestamp")
 
 class TripUpdate(BaseModel):
     """Real-time trip update message"""
+    model_config = FROZEN_MESSAGE_CONFIG
+    
     trip_id: str = Field(..., description="Trip identifier")
     route_id: str = Field(..., description="Route identifier")
     current_stop_id: Optional[str] = Field(None, description="Current stop ID")
@@ -31,6 +38,8 @@ class TripUpdate(BaseModel):
 
 class NotificationAlert(BaseModel):
     """User notification alert"""
+    model_config = FROZEN_MESSAGE_CONFIG
+    
     user_id: str = Field(..., description="Target user ID")
     notification_id: str = Field(..., description="Notification identifier")
     title: str = Field(..., description="Notification title")
@@ -89,6 +98,8 @@ class SubscriptionResponse(BaseModel):
 
 class BusLocation(BaseModel):
     """Real-time bus location update"""
+    model_config = FROZEN_MESSAGE_CONFIG
+    
     trip_id: str = Field(..., description="Trip identifier")
     vehicle_id: Optional[str] = Field(None, description="Vehicle identifier")
     location: Dict[str, float] = Field(..., description="GPS coordinates (lat, lng)")
@@ -98,6 +109,8 @@ class BusLocation(BaseModel):
 
 class StopArrival(BaseModel):
     """Stop arrival prediction"""
+    model_config = FROZEN_MESSAGE_CONFIG
+    
     trip_id: str = Field(..., description="Trip identifier")
     stop_id: str = Field(..., description="Stop identifier")
     scheduled_time: datetime = Field(..., description="Scheduled arrival time")
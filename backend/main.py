@@ -8,13 +8,17 @@ from fastapi.security import HTTPBearer
 from contextlib import asynccontextmanager
 import uvicorn
 import socketio
+import importlib.util
 from datetime import datetime
 import logging
 
 # Import custom modules
 from app.database.mongodb import init_database, close_database
-from app.core.config import settings
+from app.database.cache import init_cache, close_cache
+from app.core.config import settings, ensure_directories
+from app.core.security import AuthMiddleware
 from app.api.routes import api_router
+from app.api.responses import MongoORJSONResponse
 from app.websocket.manager import websocket_manager
 from app.simulation.engine import simulation_engine
 from app.services.realtime import realtime_service
@@ -23,6 +27,9 @@ from app.services.realtime import realtime_service
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# libuv-based event loop (installed with uvicorn[standard]; not available on Windows)
+HAS_UVLOOP = importlib.util.find_spec("uvloop") is not None
+
 # Security
 security = HTTPBearer()
 
@@ -32,10 +39,17 @@ async def lifespan(app: FastAPI):
     # Startup
     logger.info("🚌 Starting Bus Notification System...")
     
+    # Ensure data/model/log directories exist
+    ensure_directories()
+    
     # Initialize database
     await init_database()
     logger.info("✅ Database initialized")
     
+    # Initialize cache
+    await init_cache()
+    logger.info("✅ Cache initialized")
+    
     # Start simulation engine
     await simulation_engine.start()
     logger.info("✅ Simulation engine started")
@@ -67,6 +81,10 @@ async def lifespan(app: FastAPI):
     await websocket_manager.stop()
     logger.info("✅ WebSocket manager stopped")
     
+    # Close cache
+    await close_cache()
+    logger.info("✅ Cache closed")
+    
     # Close database
     await close_database()
     logger.info("✅ Database closed")
@@ -78,6 +96,7 @@ app = FastAPI(
     version="1.0.0",
     docs_url="/docs",
     redoc_url="/redoc",
+    default_response_class=MongoORJSONResponse,
     lifespan=lifespan
 )
 
@@ -90,6 +109,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Authenticate Bearer tokens once per request
+app.add_middleware(AuthMiddleware)
+
 # Include API routes
 app.include_router(api_router, prefix="/api/v1")
 
@@ -137,5 +159,6 @@ if __name__ == "__main__":
         host="0.0.0.0",
         port=8000,
         reload=True,
+        loop="uvloop" if HAS_UVLOOP else "asyncio",
         log_level="info"
     )
\ No newline at end of file
@@ -141,7 +141,7 @@ export interface TripPrediction {
   confidence: number;
   next_stop_id: string;
   estimated_arrival: string;
-  factors: Record<string, any>;
+  factors: Record<string, any> | null;
 }
 
 class ApiClient {